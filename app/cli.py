@@ -0,0 +1,267 @@
+"""
+Headless command line interface. Never imports PySide6, so it runs on
+servers and containers without a display stack.
+
+    python -m app.cli convert report.pdf "scans/**/*.pdf" -o out --ocr --lang por
+    python -m app.cli convert --manifest files.txt -o out --workers 4
+    python -m app.cli watch scanner_drop -o out --ocr
+    python -m app.cli serve --host 0.0.0.0 --port 8765 --workers 4
+
+One JSON object per file is printed to stdout as each file finishes;
+conversion logs and the per-stage timing summary go to stderr.
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+
+from app.core.config import ConfigManager
+
+def expand_inputs(patterns, manifest=None):
+    """
+    Expands files, directories, glob patterns and an optional manifest
+    (one path or pattern per line, '#' for comments) into PDF paths
+    without duplicates, keeping the given order. Returns (path, subfolder)
+    pairs: the file's folder relative to the directory or glob it was
+    found under ('' for files named directly), so the output can mirror
+    the input tree.
+    """
+    patterns = list(patterns)
+    if manifest:
+        with open(manifest, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    patterns.append(line)
+
+    files = []
+    seen = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            root = pattern
+            matches = _find_pdfs(pattern)
+        elif glob.has_magic(pattern):
+            root = _glob_root(pattern)
+            matches = sorted(glob.glob(pattern, recursive=True))
+        else:
+            root = None
+            matches = [pattern]
+        for path in matches:
+            path = os.path.abspath(path)
+            if path not in seen:
+                seen.add(path)
+                subfolder = os.path.relpath(os.path.dirname(path), os.path.abspath(root)) if root else ""
+                files.append((path, "" if subfolder == os.curdir else subfolder))
+    return files
+
+def _find_pdfs(folder):
+    """
+    PDFs under a folder, recursively, whatever the case of their
+    extension (the same files the UI's folder scan finds).
+    """
+    matches = []
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith('.pdf'):
+                matches.append(os.path.join(root, name))
+    return matches
+
+def _glob_root(pattern):
+    """The directory part of a glob pattern before its first wildcard."""
+    parts = []
+    for part in pattern.replace("\\", "/").split("/"):
+        if glob.has_magic(part):
+            break
+        parts.append(part)
+    return "/".join(parts) or os.curdir
+
+def output_collisions(output_folders):
+    """
+    Finds files that would be written to the same .docx (same name in the
+    same output folder). Returns {output path: [input paths]}.
+    """
+    targets = {}
+    for path, folder in output_folders.items():
+        name = os.path.splitext(os.path.basename(path))[0] + ".docx"
+        target = os.path.normcase(os.path.join(folder, name))
+        targets.setdefault(target, []).append(path)
+    return {target: paths for target, paths in targets.items() if len(paths) > 1}
+
+def print_result(result):
+    record = {
+        "file": result["file"],
+        "success": result["success"],
+        "duration": round(result["duration"], 3),
+    }
+    if result["success"]:
+        record["output"] = result["message"]
+    else:
+        record["error"] = result["message"]
+    print(json.dumps(record), flush=True)
+
+def log_to_stderr(message):
+    print(message, file=sys.stderr, flush=True)
+
+def run_convert(args):
+    inputs = expand_inputs(args.inputs, args.manifest)
+    if not inputs:
+        log_to_stderr("No input files")
+        return 2
+
+    # Files found under a directory or glob keep their relative folders
+    files = [path for path, _ in inputs]
+    output_folders = {path: os.path.join(args.output, subfolder) for path, subfolder in inputs}
+    collisions = output_collisions(output_folders)
+    if collisions:
+        for target, paths in collisions.items():
+            log_to_stderr(f"Output collision: {', '.join(paths)} would be written to the same file {target}")
+        return 2
+    for folder in set(output_folders.values()):
+        os.makedirs(folder, exist_ok=True)
+    config = ConfigManager()
+    use_ocr = config.get("ocr_enabled", False) if args.ocr is None else args.ocr
+    lang = args.lang or config.get("ocr_language", "por")
+
+    # Imported here so `--help` stays fast
+    from app.core.batch import BatchConverter
+    from app.core.metrics import create_recorder, StageStats
+    batch = BatchConverter(config, max_workers=args.workers)
+    metrics = create_recorder(config, log=None if args.quiet else log_to_stderr)
+    stats = StageStats()
+    metrics.add_sink(stats)
+
+    def on_result(done, total, result):
+        if not args.quiet:
+            for message in result["log"]:
+                log_to_stderr(message)
+        for event in result["events"]:
+            metrics.replay(event)
+        print_result(result)
+
+    if batch.get_workers(len(files)) > 1:
+        results = batch.run(files, args.output, use_ocr, lang, on_result=on_result,
+                            output_folders=output_folders)
+    else:
+        from app.core.converter import PDFConverter
+        converter = PDFConverter(logger_callback=(lambda m: None) if args.quiet else log_to_stderr,
+                                 metrics=metrics)
+        results = []
+        for i, path in enumerate(files, start=1):
+            start = time.perf_counter()
+            try:
+                success, msg = converter.convert(path, output_folders[path], use_ocr, lang)
+            except Exception as e:
+                success, msg = False, str(e)
+            result = {"file": path, "success": success, "message": msg,
+                      "duration": time.perf_counter() - start, "log": [], "events": []}
+            results.append(result)
+            on_result(i, len(files), result)
+
+    if not args.quiet:
+        for line in stats.format_summary():
+            log_to_stderr(line)
+    metrics.close()
+    return 0 if all(r["success"] for r in results) else 1
+
+def run_watch(args):
+    os.makedirs(args.output, exist_ok=True)
+    config = ConfigManager()
+    use_ocr = config.get("ocr_enabled", False) if args.ocr is None else args.ocr
+    lang = args.lang or config.get("ocr_language", "por")
+
+    from app.core.watch import WatchService
+    from app.core.metrics import create_recorder
+    metrics = create_recorder(config, log=None if args.quiet else log_to_stderr)
+    service = WatchService(
+        config, [os.path.abspath(f) for f in args.folders], args.output, use_ocr, lang,
+        concurrency=args.workers,
+        logger_callback=(lambda m: None) if args.quiet else log_to_stderr,
+        result_callback=print_result,
+        metrics=metrics
+    )
+    # Ctrl+C stops watching after the running conversions finish;
+    # anything still queued is picked up on the next start
+    signal.signal(signal.SIGINT, lambda signum, frame: service.stop())
+    try:
+        service.run()
+    finally:
+        metrics.close()
+    return 0
+
+def run_serve(args):
+    config = ConfigManager()
+    host = args.host or config.get("service_host", "127.0.0.1")
+    port = config.get("service_port", 8765) if args.port is None else args.port
+
+    from app.core.service import ConversionService, ServiceServer
+    from app.core.metrics import create_recorder
+    metrics = create_recorder(config, log=None if args.quiet else log_to_stderr)
+    service = ConversionService(config, workers=args.workers, work_dir=args.work_dir,
+                                logger_callback=log_to_stderr, metrics=metrics)
+    server = ServiceServer(service, host, port)
+    service.start()
+    log_to_stderr(f"Listening on {server.url}")
+    # Ctrl+C cancels the jobs in flight and removes the job files
+    signal.signal(signal.SIGINT, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        service.stop()
+        metrics.close()
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="PDF to Word converter (headless)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    convert = subparsers.add_parser("convert", help="Convert PDF files to .docx")
+    convert.add_argument("inputs", nargs="*", help="PDF files, directories or glob patterns")
+    convert.add_argument("-m", "--manifest", help="Text file with one input path or pattern per line")
+    convert.add_argument("-o", "--output", required=True, help="Output directory")
+    ocr = convert.add_mutually_exclusive_group()
+    ocr.add_argument("--ocr", dest="ocr", action="store_true", default=None, help="Enable OCR")
+    ocr.add_argument("--no-ocr", dest="ocr", action="store_false", help="Disable OCR")
+    convert.add_argument("-l", "--lang", help="OCR language (Tesseract code, e.g. por, eng)")
+    convert.add_argument("-w", "--workers", type=int, default=None,
+                         help="Documents converted at once (default: 'batch_workers' setting)")
+    convert.add_argument("-q", "--quiet", action="store_true", help="Do not print conversion logs")
+    convert.set_defaults(func=run_convert)
+
+    watch = subparsers.add_parser("watch", help="Watch folders and convert new PDFs until interrupted")
+    watch.add_argument("folders", nargs="+", help="Input folders to watch")
+    watch.add_argument("-o", "--output", required=True, help="Output directory")
+    watch_ocr = watch.add_mutually_exclusive_group()
+    watch_ocr.add_argument("--ocr", dest="ocr", action="store_true", default=None, help="Enable OCR")
+    watch_ocr.add_argument("--no-ocr", dest="ocr", action="store_false", help="Disable OCR")
+    watch.add_argument("-l", "--lang", help="OCR language (Tesseract code, e.g. por, eng)")
+    watch.add_argument("-w", "--workers", type=int, default=None,
+                       help="Documents converted at once (default: 'watch_concurrency' setting)")
+    watch.add_argument("-q", "--quiet", action="store_true", help="Do not print conversion logs")
+    watch.set_defaults(func=run_watch)
+
+    serve = subparsers.add_parser("serve", help="Run the conversion service (HTTP job API) until interrupted")
+    serve.add_argument("--host", help="Address to listen on (default: 'service_host' setting)")
+    serve.add_argument("-p", "--port", type=int, default=None,
+                       help="Port to listen on (default: 'service_port' setting)")
+    serve.add_argument("-w", "--workers", type=int, default=None,
+                       help="Documents converted at once (default: 'service_workers' setting)")
+    serve.add_argument("--work-dir", help="Where uploads and results are kept (default: system temp dir)")
+    serve.add_argument("-q", "--quiet", action="store_true", help="Do not print per-document timings")
+    serve.set_defaults(func=run_serve)
+
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
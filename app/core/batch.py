@@ -0,0 +1,180 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from app.core.cancel import init_killable_worker, kill_pool
+from app.core.converter import PDFConverter
+from app.core.metrics import MetricsRecorder, CallbackSink
+
+# Set in batch worker processes when the caller wants page progress
+_progress_queue = None
+# Blank and duplicate page checks shared by the documents a worker
+# converts, so duplicates are found across the batch
+_screener = None
+
+def _init_batch_worker(progress_queue, temp_dir=None):
+    global _progress_queue
+    _progress_queue = progress_queue
+    # Cancellable batches kill their workers on cancel (see init_killable_worker)
+    if temp_dir:
+        init_killable_worker(temp_dir)
+
+def _report_page_progress(file_path):
+    if _progress_queue is None:
+        return None
+    return lambda done, total: _progress_queue.put((file_path, done, total))
+
+def convert_document(file_path, output_folder, use_ocr, lang, cpu_budget):
+    """
+    Converts one document inside a batch worker process. Log messages and
+    metrics events are collected and returned with the result so the
+    caller can replay them in order instead of interleaving output from
+    several documents.
+    """
+    global _screener
+    messages = []
+    events = []
+    converter = PDFConverter(logger_callback=messages.append,
+                             ocr_workers=cpu_budget, docx_workers=cpu_budget,
+                             metrics=MetricsRecorder([CallbackSink(events.append)]),
+                             progress_callback=_report_page_progress(file_path),
+                             screener=_screener)
+    _screener = converter.screener
+    start = time.perf_counter()
+    try:
+        success, msg = converter.convert(file_path, output_folder, use_ocr, lang)
+    except Exception as e:
+        success, msg = False, str(e)
+    return {
+        "file": file_path,
+        "success": success,
+        "message": msg,
+        "duration": time.perf_counter() - start,
+        "pages": converter.document["pages"],
+        "log": messages,
+        "events": events,
+    }
+
+class BatchConverter:
+    """
+    Converts several documents at once, each in its own process, with at
+    most `max_workers` documents in flight.
+    """
+    def __init__(self, config, max_workers=None):
+        self.config = config
+        if max_workers is None:
+            max_workers = self.config.get("batch_workers", 0)
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    def get_workers(self, total_files):
+        return max(1, min(int(self.max_workers), total_files))
+
+    def run(self, file_paths, output_folder, use_ocr, lang,
+            on_result=None, should_continue=None, on_progress=None, cancel_token=None,
+            output_folders=None):
+        """
+        Runs the batch and returns the per-file results in input order.
+        `output_folders` maps files to their own output folder (e.g. to
+        mirror an input tree); the others go to `output_folder`.
+        `on_result(done, total, result)` is called as each file finishes;
+        `on_progress(file_path, pages_done, total_pages)` as pages are OCR'd
+        (from a helper thread); when `should_continue()` returns False
+        pending files are cancelled. Cancelling `cancel_token` also kills
+        the documents in flight (and their OCR processes); they are
+        returned with "cancelled" set.
+        """
+        total = len(file_paths)
+        if total == 0:
+            return []
+
+        workers = self.get_workers(total)
+        # Split the cores between documents so nested pools don't oversubscribe
+        cpu_budget = max(1, (os.cpu_count() or 1) // workers)
+
+        progress_queue = None
+        progress_thread = None
+        if on_progress:
+            progress_queue = multiprocessing.Queue()
+            progress_thread = threading.Thread(target=self._forward_progress,
+                                               args=(progress_queue, on_progress), daemon=True)
+            progress_thread.start()
+
+        try:
+            return self._run(file_paths, output_folder, use_ocr, lang, workers, cpu_budget,
+                             progress_queue, on_result, should_continue, cancel_token,
+                             output_folders or {})
+        finally:
+            if progress_queue is not None:
+                progress_queue.put(None)
+                progress_thread.join()
+                progress_queue.close()
+
+    def _forward_progress(self, progress_queue, on_progress):
+        while True:
+            item = progress_queue.get()
+            if item is None:
+                return
+            on_progress(*item)
+
+    def _run(self, file_paths, output_folder, use_ocr, lang, workers, cpu_budget,
+             progress_queue, on_result, should_continue, cancel_token, output_folders):
+        total = len(file_paths)
+        results = {}
+        # Killed workers cannot clean up after themselves: their temporary
+        # files go to a directory removed here
+        temp_dir = tempfile.mkdtemp(prefix="pdfconverter_batch_") if cancel_token else None
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker,
+                                     initargs=(progress_queue, temp_dir)) as executor:
+                kill = lambda: kill_pool(executor)
+                if cancel_token:
+                    cancel_token.add_callback(kill)
+                try:
+                    futures = {
+                        executor.submit(convert_document, path,
+                                        output_folders.get(path, output_folder),
+                                        use_ocr, lang, cpu_budget): path
+                        for path in file_paths
+                    }
+                    done = 0
+                    for future in as_completed(futures):
+                        path = futures[future]
+                        try:
+                            result = future.result()
+                        except Exception as e:
+                            result = {"file": path, "success": False, "message": str(e),
+                                      "duration": 0.0, "log": [], "events": []}
+                            if cancel_token and cancel_token.is_cancelled():
+                                result.update(message="Cancelled", cancelled=True)
+                        results[path] = result
+                        done += 1
+
+                        if on_result:
+                            on_result(done, total, result)
+
+                        if cancel_token and cancel_token.is_cancelled():
+                            executor.shutdown(wait=True, cancel_futures=True)
+                            # Everything not finished yet was killed or never started
+                            for path in file_paths:
+                                if path not in results:
+                                    results[path] = {"file": path, "success": False,
+                                                     "message": "Cancelled", "cancelled": True,
+                                                     "duration": 0.0, "log": [], "events": []}
+                                    done += 1
+                                    if on_result:
+                                        on_result(done, total, results[path])
+                            break
+                        if should_continue and not should_continue():
+                            executor.shutdown(wait=True, cancel_futures=True)
+                            break
+                finally:
+                    if cancel_token:
+                        cancel_token.remove_callback(kill)
+        finally:
+            if temp_dir:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+
+        return [results[path] for path in file_paths if path in results]
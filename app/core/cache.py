@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+from app import __version__
+
+def hash_file(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def hash_options(options):
+    """Stable hash of a dict of conversion options."""
+    payload = json.dumps(options, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(payload).hexdigest()
+
+class DiskCache:
+    """
+    A directory of files addressed by key, with a size limit and LRU
+    eviction. A file's mtime is its last use: hits touch it and eviction
+    removes the oldest entries first.
+    """
+    def __init__(self, directory, max_bytes, suffix=""):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.hits = 0
+        self.misses = 0
+        # Running size estimate; a full scan is only done when it overflows
+        self._size = None
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path_for(self, key):
+        return os.path.join(self.directory, f"{key}{self.suffix}")
+
+    def lookup(self, key):
+        """Returns the path of a cached entry (marking it used) or None."""
+        path = self.path_for(key)
+        try:
+            os.utime(path, None)
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    def get_bytes(self, key):
+        path = self.lookup(key)
+        if path is None:
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put_file(self, key, source_path):
+        """Copies a file into the cache atomically."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        try:
+            shutil.copyfile(source_path, tmp_path)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, self.path_for(key))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._added(size)
+
+    def put_bytes(self, key, data):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self.path_for(key))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._added(len(data))
+
+    def _added(self, size):
+        if self._size is not None:
+            self._size += size
+        if self._size is None or self._size > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """Removes least recently used entries until the cache fits max_bytes."""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if not entry.is_file() or entry.name.endswith(".tmp"):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue # Removed by another process
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+        self._size = total
+
+    def stats(self):
+        total = self.hits + self.misses
+        rate = (self.hits / total * 100) if total else 0.0
+        return f"hits: {self.hits}, misses: {self.misses}, hit rate: {rate:.0f}%"
+
+class ResultCache(DiskCache):
+    """
+    Cache of finished .docx files keyed by the input bytes plus the
+    conversion options and converter version.
+    """
+    def __init__(self, config):
+        directory = os.path.join(config.config_dir, "cache", "results")
+        max_bytes = config.get("result_cache_max_mb", 1024) * 1024 * 1024
+        super().__init__(directory, max_bytes, suffix=".docx")
+        self.use_hardlinks = config.get("result_cache_hardlink", False)
+
+    def make_key(self, input_hash, options):
+        """`input_hash` is the hash_file() of the input PDF."""
+        options = dict(options, version=__version__)
+        return hashlib.sha256(
+            (input_hash + hash_options(options)).encode('ascii')
+        ).hexdigest()
+
+    def fetch(self, key, output_path):
+        """Places a cached result at output_path. Returns True on a hit."""
+        cached = self.lookup(key)
+        if cached is None:
+            return False
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        if self.use_hardlinks:
+            try:
+                os.link(cached, output_path)
+                return True
+            except OSError:
+                pass # Different volume or unsupported, fall back to copy
+        shutil.copyfile(cached, output_path)
+        return True
+
+class PageCache(DiskCache):
+    """
+    Cache of single page searchable PDFs produced by OCR, keyed by the
+    rendered page pixels, the OCR language and the preprocessing settings.
+    """
+    def __init__(self, config):
+        directory = os.path.join(config.config_dir, "cache", "pages")
+        max_bytes = config.get("page_cache_max_mb", 512) * 1024 * 1024
+        super().__init__(directory, max_bytes, suffix=".pdf")
+
+    def make_key(self, pix, lang, preprocess_key):
+        digest = hashlib.sha256()
+        digest.update(f"{pix.width}x{pix.height}x{pix.n}".encode('ascii'))
+        digest.update(pix.samples_mv)
+        digest.update(f"|{lang}|{preprocess_key}|{__version__}".encode('utf-8'))
+        return digest.hexdigest()
@@ -0,0 +1,100 @@
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+
+class ConversionCancelled(Exception):
+    """Raised at a page or stage boundary once a conversion was cancelled."""
+
+class CancelToken:
+    """
+    Cancels a conversion from another thread (e.g. the UI's stop button).
+    The converter checks it at page and stage boundaries. Callbacks added
+    with add_callback run as soon as cancel() is called, in the calling
+    thread, so work that is blocked (OCR subprocesses, pool workers) is
+    killed right away instead of at the next check.
+    """
+    def __init__(self):
+        self.event = threading.Event()
+        self.lock = threading.Lock()
+        self.callbacks = []
+
+    def cancel(self):
+        with self.lock:
+            if self.event.is_set():
+                return
+            self.event.set()
+            callbacks = list(self.callbacks)
+        for callback in callbacks:
+            _run_callback(callback)
+
+    def is_cancelled(self):
+        return self.event.is_set()
+
+    def wait(self, timeout):
+        """Sleeps up to `timeout` seconds, less if cancelled. Returns is_cancelled()."""
+        return self.event.wait(timeout)
+
+    def check(self):
+        """Raises ConversionCancelled if the token was cancelled."""
+        if self.event.is_set():
+            raise ConversionCancelled("Conversion cancelled")
+
+    def add_callback(self, callback):
+        """Runs `callback` on cancel (right away if already cancelled)."""
+        with self.lock:
+            if not self.event.is_set():
+                self.callbacks.append(callback)
+                return
+        _run_callback(callback)
+
+    def remove_callback(self, callback):
+        with self.lock:
+            if callback in self.callbacks:
+                self.callbacks.remove(callback)
+
+def _run_callback(callback):
+    try:
+        callback()
+    except Exception as e:
+        print(f"Cancel callback error: {e}")
+
+def init_killable_worker(temp_dir=None):
+    """
+    Pool initializer for workers that may be killed on cancel. On POSIX
+    the worker leads a new process group, so kill_process_tree also
+    reaches what it starts (tesseract, pdf2docx's pool). Temporary files
+    go to `temp_dir`, which the parent removes even if the worker is
+    killed before cleaning up.
+    """
+    if hasattr(os, "setpgrp"):
+        os.setpgrp()
+    if temp_dir:
+        tempfile.tempdir = temp_dir
+        # Inherited by the processes the worker starts
+        for name in ("TMPDIR", "TEMP", "TMP"):
+            os.environ[name] = temp_dir
+
+def kill_process_tree(pid):
+    """Kills a process and its children (its process group on POSIX)."""
+    if sys.platform == "win32":
+        subprocess.run(["taskkill", "/F", "/T", "/PID", str(pid)],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                       creationflags=subprocess.CREATE_NO_WINDOW)
+        return
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except OSError:
+        # Not a group leader (yet): kill the process alone
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except OSError:
+            pass
+
+def kill_pool(executor):
+    """Kills the worker processes of a ProcessPoolExecutor and their children."""
+    processes = getattr(executor, "_processes", None) or {}
+    for process in list(processes.values()):
+        kill_process_tree(process.pid)
@@ -2,6 +2,14 @@ import json
 import os
 import platform
 
+# OCR preprocessing profiles, cheapest first (implemented in app.core.ocr):
+# - none:     grayscale only
+# - fast:     global Otsu threshold + 3x3 median
+# - balanced: adaptive Gaussian threshold + 3x3 median
+# - quality:  adaptive Gaussian threshold + non-local means denoising
+PREPROCESS_PROFILES = ["none", "fast", "balanced", "quality"]
+DEFAULT_PREPROCESS_PROFILE = "balanced"
+
 class ConfigManager:
     def __init__(self):
         self.config_dir = self._get_config_dir()
@@ -11,7 +19,55 @@ class ConfigManager:
             "output_folder": "",
             "theme": "dark",
             "ocr_enabled": False,
-            "ocr_language": "por"
+            "ocr_language": "por",
+            "ocr_workers": 0,
+            "ocr_backend": "auto",
+            "ocr_preprocess_profile": "balanced",
+            "ocr_target_dpi": 150,
+            "ocr_min_dpi": 100,
+            "ocr_max_pixels": 8000000,
+            "ocr_tile_overlap": 256,
+            "ocr_fast_tessdata_dir": "",
+            "ocr_tiered": False,
+            "ocr_best_tessdata_dir": "",
+            "ocr_tier_min_confidence": 75,
+            "ocr_max_inflight_pages": 0,
+            "ocr_flush_pages": 32,
+            "batch_workers": 0,
+            "docx_workers": 0,
+            "docx_shard_min_pages": 40,
+            "docx_engine": "pdf2docx",
+            "ocr_min_text_chars": 50,
+            "ocr_image_coverage": 0.5,
+            "ocr_skip_blank_pages": True,
+            "ocr_blank_max_ink": 0.0002,
+            "ocr_skip_duplicate_pages": True,
+            "ocr_duplicate_min_correlation": 0.5,
+            "ocr_duplicate_max_difference": 28,
+            "ocr_duplicate_window": 64,
+            "result_cache_enabled": True,
+            "result_cache_max_mb": 1024,
+            "result_cache_hardlink": False,
+            "page_cache_enabled": True,
+            "page_cache_max_mb": 512,
+            "ocr_journal_enabled": True,
+            "ocr_journal_max_age_days": 7,
+            "metrics_jsonl_path": "",
+            "metrics_prometheus_path": "",
+            "metrics_prometheus_window": 1000,
+            "ui_refresh_ms": 100,
+            "log_max_lines": 5000,
+            "watch_concurrency": 0,
+            "watch_settle_seconds": 5.0,
+            "watch_poll_seconds": 2.0,
+            "service_url": "",
+            "service_token": "",
+            "service_host": "127.0.0.1",
+            "service_port": 8765,
+            "service_workers": 0,
+            "service_max_queued": 1000,
+            "service_max_upload_mb": 500,
+            "service_job_ttl_seconds": 3600
         }
         self.config = self.load_config()
 
@@ -1,17 +1,150 @@
 from pdf2docx import Converter
 import os
 import fitz  # PyMuPDF
-from PIL import Image
-import io
+import numpy as np
 import shutil
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeout
+from app.core.cancel import ConversionCancelled, init_killable_worker, kill_pool
 from app.core.ocr import OCREngine
+from app.core.pages import needs_ocr, choose_render_dpi
+from app.core.tiling import page_tiles, ocr_page_tiled
+from app.core.cache import ResultCache, PageCache, hash_file
+from app.core.journal import OCRJournal
+from app.core.layout import encode_layout
+from app.core.metrics import MetricsRecorder
+from app.core.ocr_docx import OCRDocxWriter
+from app.core.screening import PageScreener, reuse_result
+from app.core.streaming import IncrementalPDFWriter, OCRStages
 from app.core.config import ConfigManager
 
+# Longest document pdf2docx converts in-process when it can be cancelled
+# (see _run_pdf2docx): its whole-document pass is not interruptible
+CANCEL_INPROCESS_MAX_PAGES = 4
+
+# Per-process state for the OCR worker pool (set by _init_ocr_worker)
+_worker_doc = None
+_worker_engine = None
+_worker_page_cache = None
+
+def _init_ocr_worker(input_path, temp_dir=None):
+    """
+    Opens the source PDF once per worker process. With a `temp_dir`
+    (cancellable runs) the worker is set up to be killed on cancel, see
+    init_killable_worker.
+    """
+    global _worker_doc, _worker_engine, _worker_page_cache
+    if temp_dir:
+        init_killable_worker(temp_dir)
+    config = ConfigManager()
+    _worker_doc = fitz.open(input_path)
+    _worker_engine = OCREngine(config)
+    _worker_page_cache = _make_page_cache(config)
+
+def _ocr_page_worker(page_index, lang, dpi, tiles=None, output="pdf"):
+    page = _worker_doc[page_index]
+    return _ocr_page(_worker_engine, page, lang, dpi, _worker_page_cache, tiles, output)
+
+def _make_page_cache(config):
+    if not config.get("page_cache_enabled", True):
+        return None
+    return PageCache(config)
+
+def _page_cache_variant(ocr_engine, output, lang):
+    """Page cache key part: preprocessing settings, OCR models and the kind of output."""
+    variant = ocr_engine.preprocess_key()
+    models = ocr_engine.models_key(lang)
+    if models:
+        variant = f"{variant}-{models}"
+    return variant if output == "pdf" else f"{variant}-{output}"
+
+def _ocr_page(ocr_engine, page, lang, dpi, page_cache=None, tiles=None, output="pdf"):
+    """
+    Renders a single page, preprocesses it and returns a one page
+    searchable PDF as bytes (None if OCR failed), where it came from
+    ("ocr" or "cache") and the seconds spent in each stage. Used by the
+    process pool workers; nothing touches the disk apart from the cache.
+    Pages with `tiles` (see page_tiles) are OCR'd tile by tile. With
+    output="layout" the bytes are the page's OCR layout instead.
+    """
+    if tiles:
+        return ocr_page_tiled(ocr_engine, page, lang, dpi, tiles, output)
+
+    # Render straight to grayscale, OCR does not need colour
+    start = time.perf_counter()
+    pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+    timings = {"render": time.perf_counter() - start}
+
+    cache_key = None
+    if page_cache:
+        cache_key = page_cache.make_key(pix, lang, _page_cache_variant(ocr_engine, output, lang))
+        pdf_bytes = page_cache.get_bytes(cache_key)
+        if pdf_bytes is not None:
+            return pdf_bytes, "cache", timings
+
+    # Zero-copy NumPy view over the pixmap samples
+    gray = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width]
+
+    # Preprocess (Remove background, enhance contrast)
+    start = time.perf_counter()
+    processed_image = ocr_engine.preprocess_image(gray)
+    timings["preprocess"] = time.perf_counter() - start
+
+    # Adds "ocr" (and "ocr_best" for pages re-run with the best models)
+    if output == "layout":
+        pdf_bytes = ocr_engine.image_to_layout_bytes(processed_image, lang, timings)
+    else:
+        pdf_bytes = ocr_engine.image_to_pdf_bytes(processed_image, lang, timings)
+    if cache_key and pdf_bytes:
+        try:
+            page_cache.put_bytes(cache_key, pdf_bytes)
+        except OSError as e:
+            print(f"Page cache write error: {e}")
+    return pdf_bytes, "ocr", timings
+
+def _convert_docx_multiprocess(source_file, output_path, workers, work_dir):
+    """
+    Runs pdf2docx with its own multi-processing (pages are parsed in
+    `workers` processes, then assembled into one .docx in order). pdf2docx
+    exchanges parsed pages through JSON files in the current directory,
+    so this runs in a separate process chdir'ed into a private scratch
+    dir, which keeps concurrent documents from clobbering each other.
+    """
+    os.chdir(work_dir)
+    cv = Converter(source_file)
+    try:
+        if workers > 1:
+            cv.convert(output_path, start=0, end=None, multi_processing=True, cpu_count=workers)
+        else:
+            cv.convert(output_path, start=0, end=None)
+    finally:
+        cv.close()
+
 class PDFConverter:
-    def __init__(self, logger_callback=None):
+    def __init__(self, logger_callback=None, ocr_workers=None, docx_workers=None, metrics=None,
+                 progress_callback=None, cancel_token=None, screener=None):
         self.logger_callback = logger_callback
+        # Checked at page and stage boundaries (see app/core/cancel.py)
+        self.cancel_token = cancel_token
+        # progress_callback(pages_done, total_pages), called as OCR'd pages are merged
+        self.progress_callback = progress_callback
+        # Structured timing events (see app/core/metrics.py)
+        self.metrics = metrics or MetricsRecorder()
+        self.document = self._new_document("")
         self.config = ConfigManager()
         self.ocr_engine = OCREngine(self.config)
+        # Override the "ocr_workers"/"docx_workers" settings (used by the batch executor)
+        self.ocr_workers = ocr_workers
+        self.docx_workers = docx_workers
+        self.result_cache = None
+        if self.config.get("result_cache_enabled", True):
+            self.result_cache = ResultCache(self.config)
+        self.page_cache = _make_page_cache(self.config)
+        # Blank and duplicate page checks, shared by the documents this
+        # converter (or batch worker) converts
+        self.screener = screener or PageScreener(self.config)
 
     def log(self, message):
         if self.logger_callback:
@@ -26,94 +159,626 @@ class PDFConverter:
         filename = os.path.basename(input_path)
         name, _ = os.path.splitext(filename)
         output_path = os.path.join(output_folder, f"{name}.docx")
-        
-        # Temporary file for OCR processed PDF
-        temp_pdf_path = os.path.join(output_folder, f"temp_{name}.pdf")
+
+        # Temporary file for OCR processed PDF, kept out of the output folder
+        scratch_dir = tempfile.mkdtemp(prefix="pdfconverter_")
+        temp_pdf_path = os.path.join(scratch_dir, f"temp_{name}.pdf")
 
         self.log(f"Starting conversion: {filename}")
+        # Filled in by the stages, reported as one "document" event
+        self.document = self._new_document(filename)
+        start = time.perf_counter()
+        started_at = time.time()
 
         try:
+            self._check_cancelled()
             source_file = input_path
 
+            input_hash = None
+            cache_key = None
+            if self.result_cache:
+                lookup_start = time.perf_counter()
+                input_hash = hash_file(input_path)
+                cache_key = self.result_cache.make_key(input_hash, self._cache_options(use_ocr, lang))
+                hit = self._fetch_cached(cache_key, output_path)
+                self.metrics.stage(filename, "result_cache", time.perf_counter() - lookup_start,
+                                   outcome="hit" if hit else "miss")
+                if hit:
+                    # Counted like a converted document in the metrics
+                    with fitz.open(input_path) as doc:
+                        self.document["pages"] = doc.page_count
+                    self.log(f"Result cache hit ({self.result_cache.stats()})")
+                    self.log(f"Finished: {output_path}")
+                    self.document["outcome"] = "cache"
+                    return True, output_path
+                self.log(f"Result cache miss ({self.result_cache.stats()})")
+
+            # Only cache output that was produced with the requested options
+            cacheable = True
+            journal = None
+            # Set when the OCR pipeline wrote the .docx itself (see OCRDocxWriter)
+            written = False
+            self._check_cancelled()
             if use_ocr:
                 self.log("OCR Enabled: Pre-processing pages (this may take a while)...")
                 if not self.ocr_engine.is_available():
                     self.log("Warning: Tesseract not found. Skipping OCR.")
+                    cacheable = False
                 else:
+                    if self.config.get("ocr_journal_enabled", True):
+                        if input_hash is None:
+                            input_hash = hash_file(input_path)
+                        journal = OCRJournal(self.config, input_hash, self._cache_options(True, lang))
+
                     # OCR Pipeline
                     try:
-                        processed_pdf = self._run_ocr_pipeline(input_path, temp_pdf_path, lang)
-                        if processed_pdf:
+                        processed_pdf = self._run_ocr_pipeline(input_path, temp_pdf_path, lang, journal,
+                                                               docx_path=output_path)
+                        if processed_pdf == "docx":
+                            written = True
+                            self.log("OCR complete. Word document built from the OCR layout.")
+                        elif processed_pdf:
                             source_file = temp_pdf_path
                             self.log("OCR Pre-processing complete. Converting to Word...")
+                    except ConversionCancelled:
+                        raise
                     except Exception as e:
+                        # Killed workers and OCR processes fail their pages
+                        if self._is_cancelled():
+                            raise ConversionCancelled("Conversion cancelled") from e
                         self.log(f"OCR Pipeline failed: {e}. Falling back to standard conversion.")
+                        cacheable = False
 
             # Convert to Docx
-            cv = Converter(source_file)
-            cv.convert(output_path, start=0, end=None)
-            cv.close()
-            
-            # Cleanup temp file
-            if os.path.exists(temp_pdf_path):
-                os.remove(temp_pdf_path)
-            
+            self._check_cancelled()
+            if not written:
+                self._convert_to_docx(source_file, output_path, scratch_dir)
+
+            # Pages whose OCR failed are missing from the output: it is not
+            # cached and the journal is kept, so the next run retries them
+            failed_pages = self.document["failed_pages"]
+            if failed_pages:
+                cacheable = False
+
+            # Done with OCR; a failed or fallback run keeps its journal to resume from
+            if journal and cacheable:
+                journal.discard()
+
+            if cache_key and cacheable:
+                try:
+                    self.result_cache.put_file(cache_key, output_path)
+                except OSError as e:
+                    self.log(f"Warning: could not store result in cache: {e}")
+
+            if failed_pages:
+                pages = ", ".join(str(page) for page in failed_pages)
+                self.log(f"Finished with errors: OCR failed on page(s) {pages}, {output_path} is missing their text")
+                self.document["outcome"] = "partial"
+                return False, f"OCR failed on page(s) {pages}; {output_path} is missing their text"
             self.log(f"Finished: {output_path}")
+            self.document["outcome"] = "ok"
             return True, output_path
-            
+
         except Exception as e:
+            if isinstance(e, ConversionCancelled) or self._is_cancelled():
+                # The OCR journal is kept, a later run resumes from it
+                self._remove_partial_output(output_path, started_at)
+                self.log(f"Cancelled: {filename}")
+                self.document["outcome"] = "cancelled"
+                return False, "Cancelled"
             self.log(f"Error converting {filename}: {str(e)}")
-            # Cleanup on error
-            if os.path.exists(temp_pdf_path):
-                os.remove(temp_pdf_path)
             return False, str(e)
 
-    def _run_ocr_pipeline(self, input_path, output_path, lang):
+        finally:
+            # Cleanup temp files
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+            self._emit_document(time.perf_counter() - start, output_path)
+
+    def _is_cancelled(self):
+        return self.cancel_token is not None and self.cancel_token.is_cancelled()
+
+    def _check_cancelled(self):
+        if self.cancel_token is not None:
+            self.cancel_token.check()
+
+    def _remove_partial_output(self, output_path, started_at):
+        """Removes a .docx this run started writing before it was cancelled."""
+        try:
+            if os.path.getmtime(output_path) >= started_at:
+                os.remove(output_path)
+        except OSError:
+            pass
+
+    def _result(self, future):
+        """future.result(), but gives up waiting as soon as the run is cancelled."""
+        if self.cancel_token is None:
+            return future.result()
+        while True:
+            try:
+                return future.result(timeout=0.1)
+            except FutureTimeout:
+                self.cancel_token.check()
+
+    def _new_document(self, name):
+        return {"name": name, "pages": 0, "ocr_pages": 0, "blank_pages": 0, "duplicate_pages": 0,
+                "ocr_saved_s": 0.0, "ocr_best_pages": 0, "failed_pages": [], "outcome": "error"}
+
+    def _emit_document(self, duration, output_path):
+        if self.document["outcome"] not in ("ok", "cache", "partial") or not os.path.exists(output_path):
+            nbytes = None
+        else:
+            nbytes = os.path.getsize(output_path)
+        self.metrics.emit("document", document=self.document["name"],
+                          pages=self.document["pages"], ocr_pages=self.document["ocr_pages"],
+                          blank_pages=self.document["blank_pages"],
+                          duplicate_pages=self.document["duplicate_pages"],
+                          ocr_saved_s=self.document["ocr_saved_s"],
+                          ocr_best_pages=self.document["ocr_best_pages"],
+                          failed_pages=len(self.document["failed_pages"]),
+                          duration_s=round(duration, 6), bytes=nbytes,
+                          outcome=self.document["outcome"])
+
+    def _cache_options(self, use_ocr, lang):
+        """Options that affect the output, part of the result cache key."""
+        options = {"use_ocr": use_ocr}
+        if use_ocr:
+            options.update({
+                "lang": lang,
+                "ocr_min_text_chars": self.config.get("ocr_min_text_chars", 50),
+                "ocr_image_coverage": self.config.get("ocr_image_coverage", 0.5),
+                "preprocess": self.ocr_engine.preprocess_key(),
+                "ocr_target_dpi": self.config.get("ocr_target_dpi", 150),
+                "ocr_min_dpi": self.config.get("ocr_min_dpi", 100),
+                "ocr_max_pixels": self.config.get("ocr_max_pixels", 8_000_000),
+                "ocr_tile_overlap": self.config.get("ocr_tile_overlap", 256),
+                "docx_engine": self.config.get("docx_engine", "pdf2docx"),
+                "ocr_skip_blank_pages": self.config.get("ocr_skip_blank_pages", True),
+                "ocr_blank_max_ink": self.config.get("ocr_blank_max_ink", 0.0002),
+                "ocr_skip_duplicate_pages": self.config.get("ocr_skip_duplicate_pages", True),
+                "ocr_duplicate_min_correlation": self.config.get("ocr_duplicate_min_correlation", 0.5),
+                "ocr_duplicate_max_difference": self.config.get("ocr_duplicate_max_difference", 28),
+            })
+            models = self.ocr_engine.models_key(lang)
+            if models:
+                options["ocr_models"] = models
+        return options
+
+    def _fetch_cached(self, cache_key, output_path):
+        try:
+            return self.result_cache.fetch(cache_key, output_path)
+        except OSError as e:
+            self.log(f"Warning: could not read cached result: {e}")
+            return False
+
+    def _convert_to_docx(self, source_file, output_path, scratch_dir):
         """
-        Renders PDF pages to images, preprocesses them, runs OCR, 
-        and merges them back into a searchable PDF.
+        Converts a PDF to .docx with pdf2docx. Documents with at least
+        "docx_shard_min_pages" pages are split across "docx_workers"
+        processes (0 = one per CPU core); smaller ones run in-process.
+        """
+        with fitz.open(source_file) as doc:
+            page_count = doc.page_count
+        self.document["pages"] = page_count
+
+        with self.metrics.timed(self.document["name"], "pdf2docx"):
+            self._run_pdf2docx(source_file, output_path, scratch_dir, page_count)
+
+    def _run_pdf2docx(self, source_file, output_path, scratch_dir, page_count):
+        workers = self.docx_workers or self.config.get("docx_workers", 0) or os.cpu_count() or 1
+        workers = min(int(workers), page_count)
+        sharded = workers > 1 and page_count >= self.config.get("docx_shard_min_pages", 40)
+        # pdf2docx analyses the whole document before parsing the first page;
+        # past a few pages a cancellable run does it in a process it can kill
+        isolated = self.cancel_token is not None and page_count > CANCEL_INPROCESS_MAX_PAGES
+        if sharded or isolated:
+            if sharded:
+                self.log(f"Converting {page_count} pages to Word with {workers} processes")
+            else:
+                workers = 1
+            work_dir = tempfile.mkdtemp(prefix="docx_", dir=scratch_dir)
+            # A cancellable run can kill the process with pdf2docx's pool under it
+            killable = {}
+            if self.cancel_token is not None:
+                killable = {"initializer": init_killable_worker, "initargs": (work_dir,)}
+            with ProcessPoolExecutor(max_workers=1, **killable) as executor:
+                kill = lambda: kill_pool(executor)
+                if self.cancel_token is not None:
+                    self.cancel_token.add_callback(kill)
+                try:
+                    self._result(executor.submit(
+                        _convert_docx_multiprocess,
+                        os.path.abspath(source_file),
+                        os.path.abspath(output_path),
+                        workers,
+                        work_dir
+                    ))
+                finally:
+                    if self.cancel_token is not None:
+                        self.cancel_token.remove_callback(kill)
+            return
+
+        if self.cancel_token is None:
+            cv = Converter(source_file)
+            cv.convert(output_path, start=0, end=None)
+            cv.close()
+            return
+
+        # pdf2docx's steps, one page at a time, so a cancel stops between pages
+        cv = Converter(source_file)
+        try:
+            settings = cv.default_settings
+            cv.load_pages().parse_document(**settings)
+            for page in cv.pages:
+                self._check_cancelled()
+                try:
+                    page.parse(**settings)
+                except Exception as e:
+                    if not settings["ignore_page_error"]:
+                        raise
+                    self.log(f"Ignoring page {page.id + 1}, pdf2docx could not parse it: {e}")
+            self._check_cancelled()
+            cv.make_docx(output_path, **settings)
+        finally:
+            cv.close()
+
+    def _get_ocr_workers(self, total_pages):
+        """
+        Number of OCR processes to use. 0 (the default) means one per CPU core.
+        """
+        workers = self.ocr_workers or self.config.get("ocr_workers", 0) or os.cpu_count() or 1
+        return max(1, min(int(workers), total_pages))
+
+    def _run_ocr_pipeline(self, input_path, output_path, lang, journal=None, docx_path=None):
+        """
+        Renders PDF pages to images, preprocesses them, runs OCR,
+        and merges them back into a searchable PDF. Pages that already
+        have a usable text layer are copied through without OCR.
+        Returns False if no page needed OCR.
+
+        With the "docx_engine" setting at "ocr_layout" (opt-in), when
+        every page needs OCR and a `docx_path` is given, the pages are
+        OCR'd to their layout and the Word document is written there
+        directly (see OCRDocxWriter), skipping the searchable PDF and
+        pdf2docx; "docx" is returned then. Only the text is kept: images
+        on the pages are not in that document.
+
+        Pages stream through render -> preprocess -> OCR -> append with
+        a bounded number of pages in flight, and the output is written to
+        disk incrementally, so memory stays flat for any page count.
+
+        With a `journal`, every OCR'd page is checkpointed as it finishes
+        and pages already in the journal are not OCR'd again, so an
+        interrupted run resumes where it stopped.
         """
         doc = fitz.open(input_path)
-        pdf_merger = fitz.open() # Empty PDF to merge into
-        
-        temp_files = []
-        
+        writer = None
+
         total_pages = len(doc)
-        for i, page in enumerate(doc):
-            self.log(f"OCR Processing page {i+1}/{total_pages}...")
-            
-            # Render page to high-res image
-            zoom = 2.0 # Higher zoom for better OCR
-            mat = fitz.Matrix(zoom, zoom)
-            pix = page.get_pixmap(matrix=mat)
-            
-            # Convert to PIL
-            img_data = pix.tobytes("png")
-            pil_image = Image.open(io.BytesIO(img_data))
-            
-            # Preprocess (Remove background, enhance contrast)
-            processed_image = self.ocr_engine.preprocess_image(pil_image)
-            
-            # Save temp PDF page
-            temp_page_pdf = f"{output_path}_page_{i}.pdf"
-            success = self.ocr_engine.create_searchable_pdf(processed_image, temp_page_pdf, lang)
-            
-            if success:
-                temp_files.append(temp_page_pdf)
-                # Merge into main PDF
-                with fitz.open(temp_page_pdf) as page_pdf:
-                    pdf_merger.insert_pdf(page_pdf)
+        name = self.document["name"]
+        try:
+            with self.metrics.timed(name, "classify"):
+                min_text_chars = self.config.get("ocr_min_text_chars", 50)
+                image_threshold = self.config.get("ocr_image_coverage", 0.5)
+                ocr_pages = [i for i, page in enumerate(doc)
+                             if needs_ocr(page, min_text_chars, image_threshold)]
+
+                max_pixels = self.config.get("ocr_max_pixels", 8_000_000)
+                render_dpi = {}
+                # Pages still over the pixel budget at the lowest DPI are OCR'd in tiles
+                tiles = {}
+                for i in ocr_pages:
+                    render_dpi[i] = choose_render_dpi(
+                        doc[i],
+                        self.config.get("ocr_target_dpi", 150),
+                        self.config.get("ocr_min_dpi", 100),
+                        max_pixels
+                    )
+                    page_tile_list = page_tiles(doc[i], render_dpi[i], max_pixels,
+                                                self.config.get("ocr_tile_overlap", 256))
+                    if page_tile_list:
+                        tiles[i] = page_tile_list
+
+            if not ocr_pages:
+                self.log("All pages already have text. Skipping OCR.")
+                return False
+            self.log(f"{len(ocr_pages)} of {total_pages} pages need OCR")
+            self.document["ocr_pages"] = len(ocr_pages)
+            # Any other value (including the old default "auto") keeps pdf2docx
+            direct = (docx_path is not None and len(ocr_pages) == total_pages
+                      and self.config.get("docx_engine", "pdf2docx") == "ocr_layout")
+            output = "layout" if direct else "pdf"
+            if direct:
+                self.log("Every page needs OCR: building the Word document from the OCR layout")
+                self.log("Note: only the recognised text is kept; photos, logos and signatures "
+                         "are not in the Word document (docx_engine \"pdf2docx\" keeps them)")
+            for i in ocr_pages:
+                if i in tiles:
+                    self.log(f"Page {i+1}: rendering at {render_dpi[i]} DPI in {len(tiles[i])} tiles")
+                else:
+                    self.log(f"Page {i+1}: rendering at {render_dpi[i]} DPI")
+
+            resumed = journal.completed_pages() & set(ocr_pages) if journal else set()
+            if resumed:
+                self.log(f"Resuming OCR: {len(resumed)} of {len(ocr_pages)} pages already done")
+
+            screener = self.screener if self.screener.enabled else None
+            if screener:
+                screener.start_document()
+            tiered = self._log_ocr_tiers(lang)
+
+            workers = self._get_ocr_workers(max(1, len(ocr_pages) - len(resumed)))
+            max_inflight = self.config.get("ocr_max_inflight_pages", 0) or workers * 2 + 2
+            if direct:
+                writer = OCRDocxWriter(docx_path)
+            else:
+                writer = IncrementalPDFWriter(output_path, self.config.get("ocr_flush_pages", 32))
+
+            # An in-process engine that cannot be interrupted (tesserocr)
+            # would make cancel wait for the page; cancellable runs use a
+            # worker process instead, killed on cancel
+            isolated = self.cancel_token is not None and not self.ocr_engine.is_killable()
+            if workers > 1 or isolated:
+                self.log(f"OCR using {workers} worker process{'es' if workers > 1 else ''}")
+                # Cancellable runs kill the workers on cancel; their temporary
+                # files go to the scratch dir (where output_path is), which
+                # convert() removes
+                temp_dir = None
+                if self.cancel_token is not None:
+                    temp_dir = os.path.dirname(os.path.abspath(output_path))
+                with ProcessPoolExecutor(max_workers=workers,
+                                         initializer=_init_ocr_worker,
+                                         initargs=(input_path, temp_dir)) as executor:
+                    kill = lambda: kill_pool(executor)
+                    if self.cancel_token is not None:
+                        self.cancel_token.add_callback(kill)
+                    try:
+                        submit = lambda i: (executor.submit(_ocr_page_worker, i, lang, render_dpi[i],
+                                                            tiles.get(i), output), None)
+                        self._stream_pages(doc, writer, render_dpi, submit, max_inflight, journal, resumed,
+                                           screener, lang, tiered)
+                    except Exception:
+                        # A page error aborts the pipeline
+                        executor.shutdown(wait=True, cancel_futures=True)
+                        raise
+                    finally:
+                        if self.cancel_token is not None:
+                            self.cancel_token.remove_callback(kill)
             else:
-                self.log(f"Failed to OCR page {i+1}")
-
-        # Save the final searchable PDF
-        pdf_merger.save(output_path)
-        pdf_merger.close()
-        doc.close()
-        
-        # Cleanup temp page files
-        for f in temp_files:
-            if os.path.exists(f):
-                os.remove(f)
-                
+                stages = OCRStages(self.ocr_engine, lang, self.page_cache, output)
+
+                def stop_ocr():
+                    stages.cancel()
+                    self.ocr_engine.terminate()
+
+                if self.cancel_token is not None:
+                    self.cancel_token.add_callback(stop_ocr)
+                try:
+                    submit = lambda i: self._submit_page(stages, doc[i], lang, render_dpi[i], tiles.get(i))
+                    self._stream_pages(doc, writer, render_dpi, submit, max_inflight, journal, resumed,
+                                       screener, lang, tiered)
+                finally:
+                    if self.cancel_token is not None:
+                        self.cancel_token.remove_callback(stop_ocr)
+                    stages.close()
+
+            # Save the final searchable PDF (or Word document); close()
+            # releases the writer even when it raises
+            try:
+                with self.metrics.timed(name, "docx" if direct else "merge"):
+                    writer.close()
+            finally:
+                writer = None
+        finally:
+            if isinstance(writer, IncrementalPDFWriter):
+                writer.doc.close()
+            doc.close()
+
+        if direct:
+            self.document["pages"] = total_pages
+            return "docx"
         return True
+
+    def _log_ocr_tiers(self, lang):
+        """Reports whether pages get a second OCR tier. Returns True if they do."""
+        engine = self.ocr_engine
+        if not engine.tiered:
+            return False
+        if engine.best_models_dir(lang) is None:
+            self.log(f"Tiered OCR: no best models for '{lang}' in {engine.best_tessdata_dir} "
+                     f"(run setup_languages.py --best), using one model set")
+            return False
+        self.log(f"Tiered OCR: pages read with under {engine.min_confidence}% confidence "
+                 f"are OCR'd again with the models in {engine.best_tessdata_dir}")
+        return True
+
+    def _submit_page(self, stages, page, lang, dpi, tiles=None):
+        """
+        Renders a page on this thread and hands it to the OCR stages.
+        Returns the page's future and the pixmap, which must stay alive
+        until the page is done (the stages read a view over its samples).
+        Pages with `tiles` are OCR'd right here, one tile at a time.
+        """
+        if tiles:
+            future = Future()
+            try:
+                future.set_result(ocr_page_tiled(self.ocr_engine, page, lang, dpi, tiles, stages.output,
+                                                 self.cancel_token))
+            except Exception as e:
+                future.set_exception(e)
+            return future, None
+
+        # Render straight to grayscale, OCR does not need colour
+        start = time.perf_counter()
+        pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+        timings = {"render": time.perf_counter() - start}
+
+        cache_key = None
+        if self.page_cache:
+            cache_key = self.page_cache.make_key(pix, lang, _page_cache_variant(self.ocr_engine, stages.output,
+                                                                                 lang))
+            pdf_bytes = self.page_cache.get_bytes(cache_key)
+            if pdf_bytes is not None:
+                future = Future()
+                future.set_result((pdf_bytes, "cache", timings))
+                return future, None
+
+        # Zero-copy NumPy view over the pixmap samples
+        gray = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width]
+        return stages.submit(gray, cache_key, timings), pix
+
+    def _stream_pages(self, doc, writer, render_dpi, submit, max_inflight,
+                      journal=None, resumed=(), screener=None, lang=None, tiered=False):
+        """
+        Submits OCR pages through `submit(page_index)` while appending
+        finished pages to `writer` in page order. At most `max_inflight`
+        pages are waiting at any time. Pages in `resumed` are read back
+        from the journal instead. With a `screener`, blank pages are not
+        OCR'd and near-duplicates of an earlier page reuse its result.
+        With `tiered` OCR, the pages re-run with the best models are
+        counted and reported at the end.
+        """
+        total_ocr = len(render_dpi)
+        inflight = deque()
+        state = {"done": 0, "cached": 0, "journal": journal,
+                 "direct": isinstance(writer, OCRDocxWriter),
+                 # page -> (earlier page, its output kind) for duplicates
+                 "reuse": {}, "blank": 0, "duplicate": 0, "screen_s": 0.0, "screener": screener,
+                 # OCR'd pages, and those re-run with the best models (tiered OCR)
+                 "ocr": 0, "best": 0, "best_s": 0.0}
+        name = self.document["name"]
+        output = "layout" if state["direct"] else "pdf"
+
+        for i in range(doc.page_count):
+            self._check_cancelled()
+            pdf_bytes = journal.load(i) if i in resumed else None
+            if pdf_bytes is not None:
+                future = Future()
+                future.set_result((pdf_bytes, "journal", {}))
+                inflight.append((i, future, None))
+            elif i in render_dpi:
+                kind, match, signature = "unique", None, None
+                if screener:
+                    kind, match, signature, seconds = screener.screen(doc[i], lang)
+                    state["screen_s"] += seconds
+                    self.metrics.stage(name, "screen", seconds, page=i + 1, outcome=kind)
+                if kind == "blank":
+                    future = Future()
+                    future.set_result((None, "blank", {}))
+                    inflight.append((i, future, None))
+                elif kind == "duplicate":
+                    label, future, source_output = match
+                    # Waits for the earlier page's OCR, whichever document it is in
+                    state["reuse"][i] = (label, source_output)
+                    inflight.append((i, future, None))
+                else:
+                    item = (i,) + submit(i)
+                    if screener:
+                        screener.remember(signature, f"page {i+1} of {name}", item[1], output)
+                    inflight.append(item)
+            else:
+                inflight.append((i, None, None))
+            # Text pages at the head are appended right away
+            while inflight and (inflight[0][1] is None or len(inflight) > max_inflight):
+                self._append_page(doc, writer, inflight.popleft(), total_ocr, state)
+
+        while inflight:
+            self._check_cancelled()
+            self._append_page(doc, writer, inflight.popleft(), total_ocr, state)
+
+        if state["cached"]:
+            self.log(f"Reused {state['cached']} of {total_ocr} OCR pages from the page cache")
+        skipped = state["blank"] + state["duplicate"]
+        if skipped:
+            average = screener.average_ocr_seconds()
+            saved = skipped * average if average else 0.0
+            self.document.update(blank_pages=state["blank"], duplicate_pages=state["duplicate"],
+                                 ocr_saved_s=round(saved, 3))
+            estimate = f", about {saved:.1f} s of OCR saved" if average else ""
+            self.log(f"Skipped OCR on {state['blank']} blank and {state['duplicate']} duplicate "
+                     f"pages{estimate} (screening took {state['screen_s']:.1f} s)")
+        if tiered and state["ocr"]:
+            self.document["ocr_best_pages"] = state["best"]
+            self.log(f"Tiered OCR: {state['ocr'] - state['best']} of {state['ocr']} pages read with the fast "
+                     f"models only, {state['best']} OCR'd again with the best models "
+                     f"({state['best_s']:.1f} s)")
+
+    def _append_page(self, doc, writer, item, total_ocr, state):
+        i, future, _ = item
+        name = self.document["name"]
+        if future is None:
+            # Text page: pass through untouched
+            start = time.perf_counter()
+            writer.append_page(doc, i)
+            self.metrics.stage(name, "merge", time.perf_counter() - start, page=i + 1, outcome="text")
+            self._report_progress(i + 1, doc.page_count)
+            return
+
+        pdf_bytes, source, timings = self._result(future)
+        if source == "blank":
+            self._append_blank_page(doc, writer, i, state)
+            return
+        reuse = state["reuse"].pop(i, None)
+        if reuse is not None:
+            label, source_output = reuse
+            start = time.perf_counter()
+            if pdf_bytes:
+                pdf_bytes = reuse_result(pdf_bytes, source_output, doc[i],
+                                         "layout" if state["direct"] else "pdf")
+            source, timings = "duplicate", {"reuse": time.perf_counter() - start}
+            state["duplicate"] += 1
+            self.log(f"Page {i+1} is a duplicate of {label}, reusing its OCR")
+        elif source == "ocr":
+            state["ocr"] += 1
+            if "ocr_best" in timings:
+                state["best"] += 1
+                state["best_s"] += timings["ocr_best"]
+            if state["screener"]:
+                state["screener"].record_ocr(sum(timings.values()))
+        if not pdf_bytes:
+            # A page whose OCR process was killed is not a failed page
+            self._check_cancelled()
+        outcome = ("ok" if source == "ocr" else source) if pdf_bytes else "failed"
+        for stage, duration in timings.items():
+            nbytes = len(pdf_bytes) if stage == "ocr" and pdf_bytes else None
+            self.metrics.stage(name, stage, duration, page=i + 1, nbytes=nbytes, outcome=outcome)
+
+        state["done"] += 1
+        if source == "cache":
+            state["cached"] += 1
+        self.log(f"OCR Processing page {i+1} ({state['done']}/{total_ocr})...")
+        if pdf_bytes:
+            if state["journal"] and source != "journal":
+                try:
+                    state["journal"].save(i, pdf_bytes)
+                except OSError as e:
+                    self.log(f"Warning: could not checkpoint page {i+1}: {e}")
+            start = time.perf_counter()
+            if state["direct"]:
+                writer.append_layout_bytes(pdf_bytes, doc[i].rect)
+            else:
+                writer.append_pdf_bytes(pdf_bytes)
+            self.metrics.stage(name, "merge", time.perf_counter() - start, page=i + 1,
+                               nbytes=len(pdf_bytes), outcome=outcome)
+        else:
+            self.log(f"Failed to OCR page {i+1}")
+            self.document["failed_pages"].append(i + 1)
+        self._report_progress(i + 1, doc.page_count)
+
+    def _append_blank_page(self, doc, writer, i, state):
+        """Adds a blank page as it is: no text layer (an empty page in the .docx)."""
+        start = time.perf_counter()
+        if state["direct"]:
+            rect = doc[i].rect
+            writer.append_layout_bytes(encode_layout((rect.width, rect.height), []), rect)
+        else:
+            writer.append_page(doc, i)
+        self.metrics.stage(self.document["name"], "merge", time.perf_counter() - start,
+                           page=i + 1, outcome="blank")
+        state["blank"] += 1
+        state["done"] += 1
+        self.log(f"Page {i+1} is blank, skipping OCR")
+        self._report_progress(i + 1, doc.page_count)
+
+    def _report_progress(self, done, total):
+        if self.progress_callback:
+            self.progress_callback(done, total)
@@ -0,0 +1,81 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from app import __version__
+from app.core.cache import hash_options
+
+class OCRJournal:
+    """
+    Checkpoint journal for one document's OCR run. Each finished page's
+    searchable PDF is written to the journal directory as soon as it is
+    done, so a rerun after a crash or stop resumes from the pages that
+    are missing. The directory is keyed by the input hash and the OCR
+    options; manifest.json records both for inspection.
+    """
+    def __init__(self, config, input_hash, options):
+        self.root = os.path.join(config.config_dir, "journals")
+        options = dict(options, version=__version__)
+        key = f"{input_hash[:32]}-{hash_options(options)[:16]}"
+        self.directory = os.path.join(self.root, key)
+        os.makedirs(self.directory, exist_ok=True)
+
+        manifest_path = os.path.join(self.directory, "manifest.json")
+        if not os.path.exists(manifest_path):
+            self._write(manifest_path, json.dumps({
+                "input_hash": input_hash,
+                "options": options,
+                "created": time.time(),
+            }, indent=4, default=str).encode('utf-8'))
+
+        self.prune(config.get("ocr_journal_max_age_days", 7))
+
+    def _page_path(self, page_index):
+        return os.path.join(self.directory, f"page_{page_index}.pdf")
+
+    def _write(self, path, data):
+        # Write then rename, so a crash never leaves a truncated page behind
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def completed_pages(self):
+        pages = set()
+        for name in os.listdir(self.directory):
+            if name.startswith("page_") and name.endswith(".pdf"):
+                pages.add(int(name[5:-4]))
+        return pages
+
+    def load(self, page_index):
+        try:
+            with open(self._page_path(page_index), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def save(self, page_index, pdf_bytes):
+        self._write(self._page_path(page_index), pdf_bytes)
+
+    def discard(self):
+        """Removes the journal once the document has been written."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def prune(self, max_age_days):
+        """Removes journals of other documents that were abandoned."""
+        cutoff = time.time() - max_age_days * 86400
+        for entry in os.scandir(self.root):
+            if entry.path == self.directory or not entry.is_dir():
+                continue
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+            except OSError:
+                pass
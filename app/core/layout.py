@@ -0,0 +1,16 @@
+import json
+
+# The OCR layout of a page: the size of the OCR'd image and its words as
+#   [block, paragraph, line, left, top, right, bottom, confidence, text]
+# in reading order, with boxes in the image's coordinates. Encoded as
+# JSON bytes so it goes through the page cache and the OCR journal just
+# like a page's PDF bytes.
+
+def encode_layout(size, words):
+    layout = {"size": [size[0], size[1]], "words": [list(word) for word in words]}
+    return json.dumps(layout, separators=(",", ":")).encode("utf-8")
+
+def decode_layout(data):
+    """Returns ((width, height), words) from encode_layout's bytes."""
+    layout = json.loads(data)
+    return tuple(layout["size"]), layout["words"]
@@ -0,0 +1,307 @@
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Event records are plain dicts so they can be returned from worker
+# processes and written as JSON:
+#   {"ts": ..., "event": "stage", "document": "a.pdf", "stage": "ocr",
+#    "page": 3, "duration_s": 0.81, "bytes": 51234, "outcome": "ok"}
+#   {"ts": ..., "event": "document", "document": "a.pdf", "pages": 12,
+#    "ocr_pages": 10, "duration_s": 9.4, "bytes": 80211, "outcome": "ok"}
+# Document events also count the pages whose OCR was skipped
+# ("blank_pages", "duplicate_pages", "ocr_saved_s") and the pages re-run
+# with the best models under tiered OCR ("ocr_best_pages").
+
+class MetricsRecorder:
+    """
+    Emits structured timing events to a list of sinks. A sink is any
+    object with handle(event) and close().
+    """
+    def __init__(self, sinks=None):
+        self.sinks = list(sinks or [])
+        self.lock = threading.Lock()
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+
+    def emit(self, event, **fields):
+        record = {"ts": time.time(), "event": event}
+        record.update(fields)
+        self.replay(record)
+
+    def replay(self, record):
+        """Sends an already built event (e.g. from a worker process) to the sinks."""
+        with self.lock:
+            for sink in self.sinks:
+                try:
+                    sink.handle(record)
+                except Exception as e:
+                    print(f"Metrics sink error: {e}")
+
+    def stage(self, document, stage, duration, page=None, nbytes=None, outcome="ok"):
+        self.emit("stage", document=document, stage=stage, page=page,
+                  duration_s=round(duration, 6), bytes=nbytes, outcome=outcome)
+
+    @contextmanager
+    def timed(self, document, stage, page=None):
+        """Times the block as one stage event; the outcome is "error" if it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.stage(document, stage, time.perf_counter() - start, page, outcome="error")
+            raise
+        self.stage(document, stage, time.perf_counter() - start, page)
+
+    def close(self):
+        for sink in self.sinks:
+            try:
+                sink.close()
+            except Exception as e:
+                print(f"Metrics sink error: {e}")
+
+def create_recorder(config, log=None):
+    """
+    Builds a recorder with the sinks enabled in the config: the UI/CLI log
+    (document events only), a JSON-lines file ("metrics_jsonl_path") and
+    a Prometheus textfile ("metrics_prometheus_path").
+    """
+    recorder = MetricsRecorder()
+    if log:
+        recorder.add_sink(LogSink(log))
+    jsonl_path = config.get("metrics_jsonl_path", "")
+    if jsonl_path:
+        recorder.add_sink(JsonLinesSink(jsonl_path))
+    prometheus_path = config.get("metrics_prometheus_path", "")
+    if prometheus_path:
+        recorder.add_sink(PrometheusTextfileSink(prometheus_path,
+                                                 window=config.get("metrics_prometheus_window", 1000)))
+    return recorder
+
+class CallbackSink:
+    """Passes the raw event dicts to a callback (e.g. list.append)."""
+    def __init__(self, callback):
+        self.callback = callback
+
+    def handle(self, event):
+        self.callback(event)
+
+    def close(self):
+        pass
+
+class LogSink:
+    """Writes a one line summary of selected events to a log callback."""
+    def __init__(self, log, events=("document",)):
+        self.log = log
+        self.events = events
+
+    def handle(self, event):
+        if event["event"] not in self.events:
+            return
+        if event["event"] == "document":
+            skipped = (event.get("blank_pages") or 0) + (event.get("duplicate_pages") or 0)
+            ocr = f"{event['ocr_pages']} OCR, {skipped} skipped" if skipped else f"{event['ocr_pages']} OCR"
+            if event.get("ocr_best_pages"):
+                ocr += f", {event['ocr_best_pages']} with best models"
+            self.log(f"[metrics] {event['document']}: {event['pages']} pages "
+                     f"({ocr}) in {event['duration_s']:.2f} s, {event['outcome']}")
+        else:
+            page = f" page {event['page']}" if event.get("page") else ""
+            self.log(f"[metrics] {event['document']}{page} {event['stage']}: "
+                     f"{event['duration_s'] * 1000:.1f} ms, {event['outcome']}")
+
+    def close(self):
+        pass
+
+class JsonLinesSink:
+    """Appends one JSON object per event to a file."""
+    def __init__(self, path):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def handle(self, event):
+        self.file.write(json.dumps(event) + "\n")
+        if event["event"] == "document":
+            self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[rank - 1]
+
+class StageStats:
+    """
+    Aggregates events into per-stage duration lists and document totals,
+    for p50/p95 summaries. With a `window`, percentiles only cover each
+    stage's last `window` durations (counts and totals stay cumulative),
+    so long-running services keep bounded memory.
+    """
+    def __init__(self, window=None):
+        self.window = window
+        self.durations = {}
+        self.counts = {}
+        self.totals = {}
+        self.outcomes = {}
+        self.documents = {}
+        self.pages = 0
+        # Pages whose OCR was skipped, by reason, and the OCR time that saved
+        self.skipped = {"blank": 0, "duplicate": 0}
+        self.saved_s = 0.0
+        # Pages OCR'd again with the best models (tiered OCR)
+        self.best_pages = 0
+        self.first_start = None
+        self.last_end = None
+
+    def handle(self, event):
+        if event["event"] == "stage":
+            stage = event["stage"]
+            if stage not in self.durations:
+                self.durations[stage] = deque(maxlen=self.window) if self.window else []
+            self.durations[stage].append(event["duration_s"])
+            self.counts[stage] = self.counts.get(stage, 0) + 1
+            self.totals[stage] = self.totals.get(stage, 0.0) + event["duration_s"]
+            key = (event["stage"], event["outcome"])
+            self.outcomes[key] = self.outcomes.get(key, 0) + 1
+        elif event["event"] == "document":
+            self.documents[event["outcome"]] = self.documents.get(event["outcome"], 0) + 1
+            self.pages += event.get("pages") or 0
+            self.skipped["blank"] += event.get("blank_pages") or 0
+            self.skipped["duplicate"] += event.get("duplicate_pages") or 0
+            self.saved_s += event.get("ocr_saved_s") or 0.0
+            self.best_pages += event.get("ocr_best_pages") or 0
+            start = event["ts"] - event["duration_s"]
+            if self.first_start is None or start < self.first_start:
+                self.first_start = start
+            if self.last_end is None or event["ts"] > self.last_end:
+                self.last_end = event["ts"]
+
+    def close(self):
+        pass
+
+    def summary(self):
+        stages = {}
+        for stage, values in self.durations.items():
+            stages[stage] = {
+                "count": self.counts[stage],
+                "total_s": self.totals[stage],
+                "p50_s": percentile(values, 0.50),
+                "p95_s": percentile(values, 0.95),
+            }
+        wall = (self.last_end - self.first_start) if self.documents else 0.0
+        return {
+            "documents": dict(self.documents),
+            "pages": self.pages,
+            "wall_s": wall,
+            "pages_per_s": self.pages / wall if wall > 0 else None,
+            "skipped_pages": dict(self.skipped),
+            "ocr_saved_s": self.saved_s,
+            "ocr_best_pages": self.best_pages,
+            "stages": stages,
+        }
+
+    def format_summary(self):
+        """Summary as lines of text for the log."""
+        summary = self.summary()
+        lines = []
+        if summary["pages_per_s"]:
+            lines.append(f"Throughput: {summary['pages']} pages in {summary['wall_s']:.1f} s "
+                         f"({summary['pages_per_s']:.2f} pages/s)")
+        skipped = summary["skipped_pages"]
+        if skipped["blank"] or skipped["duplicate"]:
+            lines.append(f"Skipped OCR: {skipped['blank']} blank and {skipped['duplicate']} duplicate pages "
+                         f"(about {summary['ocr_saved_s']:.1f} s saved)")
+        if summary["ocr_best_pages"]:
+            best = summary["stages"].get("ocr_best", {}).get("total_s", 0.0)
+            lines.append(f"Tiered OCR: {summary['ocr_best_pages']} pages OCR'd again with the best models "
+                         f"({best:.1f} s)")
+        for stage, stats in sorted(summary["stages"].items(), key=lambda item: -item[1]["total_s"]):
+            lines.append(f"  {stage:<12} n={stats['count']:<5} p50={stats['p50_s'] * 1000:8.1f} ms  "
+                         f"p95={stats['p95_s'] * 1000:8.1f} ms  total={stats['total_s']:.2f} s")
+        return lines
+
+class PrometheusTextfileSink:
+    """
+    Keeps cumulative counters and rewrites a Prometheus textfile (for
+    node_exporter's textfile collector) after every document. The file is
+    replaced atomically so the collector never reads a partial file.
+    Stage quantiles cover the last `window` events of each stage.
+    """
+    def __init__(self, path, prefix="pdfconverter", window=1000):
+        self.path = path
+        self.prefix = prefix
+        self.window = window
+        self.stats = StageStats(window=window)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def handle(self, event):
+        self.stats.handle(event)
+        if event["event"] == "document":
+            self.write()
+
+    def close(self):
+        if self.stats.documents:
+            self.write()
+
+    def render(self):
+        p = self.prefix
+        summary = self.stats.summary()
+        lines = [
+            f"# HELP {p}_stage_seconds Time spent in each conversion stage "
+            f"(quantiles over the last {self.window} events).",
+            f"# TYPE {p}_stage_seconds summary",
+        ]
+        for stage, stats in sorted(summary["stages"].items()):
+            for quantile, key in (("0.5", "p50_s"), ("0.95", "p95_s")):
+                lines.append(f'{p}_stage_seconds{{stage="{stage}",quantile="{quantile}"}} {stats[key]:.6f}')
+            lines.append(f'{p}_stage_seconds_sum{{stage="{stage}"}} {stats["total_s"]:.6f}')
+            lines.append(f'{p}_stage_seconds_count{{stage="{stage}"}} {stats["count"]}')
+
+        lines += [f"# HELP {p}_stage_events_total Stage events by outcome.",
+                  f"# TYPE {p}_stage_events_total counter"]
+        for (stage, outcome), count in sorted(self.stats.outcomes.items()):
+            lines.append(f'{p}_stage_events_total{{stage="{stage}",outcome="{outcome}"}} {count}')
+
+        lines += [f"# HELP {p}_documents_total Converted documents by outcome.",
+                  f"# TYPE {p}_documents_total counter"]
+        for outcome, count in sorted(summary["documents"].items()):
+            lines.append(f'{p}_documents_total{{outcome="{outcome}"}} {count}')
+
+        lines += [f"# HELP {p}_pages_total Pages in converted documents.",
+                  f"# TYPE {p}_pages_total counter",
+                  f"{p}_pages_total {summary['pages']}"]
+
+        lines += [f"# HELP {p}_ocr_skipped_pages_total Pages not OCR'd because they were blank or duplicates.",
+                  f"# TYPE {p}_ocr_skipped_pages_total counter"]
+        for reason, count in sorted(summary["skipped_pages"].items()):
+            lines.append(f'{p}_ocr_skipped_pages_total{{reason="{reason}"}} {count}')
+        lines += [f"# HELP {p}_ocr_saved_seconds_total Estimated OCR time saved by skipping pages.",
+                  f"# TYPE {p}_ocr_saved_seconds_total counter",
+                  f"{p}_ocr_saved_seconds_total {summary['ocr_saved_s']:.3f}"]
+        lines += [f"# HELP {p}_ocr_best_pages_total Pages OCR'd again with the best models (tiered OCR).",
+                  f"# TYPE {p}_ocr_best_pages_total counter",
+                  f"{p}_ocr_best_pages_total {summary['ocr_best_pages']}"]
+        return "\n".join(lines) + "\n"
+
+    def write(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(self.render())
+            os.replace(tmp_path, self.path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
@@ -2,13 +2,259 @@ import pytesseract
 from PIL import Image
 import os
 import sys
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
 import cv2
 import numpy as np
+from app.core.config import PREPROCESS_PROFILES, DEFAULT_PREPROCESS_PROFILE
+from app.core.layout import encode_layout
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+# Tesseract commands already known to work, so is_available() only spawns
+# a process the first time in each process
+_available_cmds = set()
+
+# Loaded tesserocr engines, one per (tessdata dir, language) and process
+_tesserocr_apis = {}
+_tesserocr_lock = threading.Lock()
+
+def mean_confidence(words):
+    """
+    Mean Tesseract confidence (0-100) of (..., confidence, text) word
+    tuples. A page where nothing was read scores 0.
+    """
+    confidences = [word[7] for word in words if word[7] >= 0]
+    return sum(confidences) / len(confidences) if confidences else 0.0
+
+def _add_time(timings, stage, start):
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
+
+class PytesseractBackend:
+    """
+    Runs the tesseract executable once per page, with pytesseract's
+    command line and settings. Always available when Tesseract is
+    installed; used as the fallback.
+    """
+    name = "pytesseract"
+    # terminate() stops the page being OCR'd
+    killable = True
+
+    def __init__(self):
+        # Running tesseract processes, so terminate() can kill them
+        self.processes = set()
+        self.lock = threading.Lock()
+        self.terminated = False
+
+    def is_available(self):
+        cmd = pytesseract.pytesseract.tesseract_cmd
+        if cmd in _available_cmds:
+            return True
+        try:
+            pytesseract.get_tesseract_version()
+        except Exception:
+            return False
+        _available_cmds.add(cmd)
+        return True
+
+    def _run(self, image, lang, extensions, tessdata_dir=None):
+        """
+        Runs tesseract on an image and returns the bytes of its output
+        files, one per extension (e.g. ["pdf", "tsv"] from a single run).
+        Same command line as pytesseract, but the process is kept so
+        terminate() can stop it.
+        """
+        scratch_dir = tempfile.mkdtemp(prefix="pdfconverter_tess_")
+        try:
+            input_path = os.path.join(scratch_dir, "input.png")
+            image.save(input_path)
+            output_base = os.path.join(scratch_dir, "output")
+            cmd = [pytesseract.pytesseract.tesseract_cmd, input_path, output_base, "-l", lang]
+            if tessdata_dir:
+                cmd += ["--tessdata-dir", tessdata_dir]
+            cmd += extensions
+            process = subprocess.Popen(cmd, **pytesseract.pytesseract.subprocess_args(False))
+            with self.lock:
+                self.processes.add(process)
+                # Started while terminate() was running
+                if self.terminated:
+                    process.kill()
+            try:
+                _, error = process.communicate()
+            finally:
+                with self.lock:
+                    self.processes.discard(process)
+            if process.returncode != 0:
+                message = error.decode("utf-8", errors="replace").strip()
+                raise RuntimeError(f"tesseract exited with code {process.returncode}: {message}")
+            outputs = []
+            for extension in extensions:
+                with open(f"{output_base}.{extension}", 'rb') as f:
+                    outputs.append(f.read())
+            return outputs
+        finally:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    def terminate(self):
+        """Kills the running processes and any started from now on."""
+        with self.lock:
+            self.terminated = True
+            processes = list(self.processes)
+        for process in processes:
+            try:
+                process.kill()
+            except OSError:
+                pass
+
+    def image_to_pdf_bytes(self, image, lang, tessdata_dir=None):
+        return self._run(image, lang, ["pdf"], tessdata_dir)[0]
+
+    def image_to_pdf_and_confidence(self, image, lang, tessdata_dir=None):
+        # One run writes both the PDF and the TSV with the word confidences
+        pdf_bytes, tsv = self._run(image, lang, ["pdf", "tsv"], tessdata_dir)
+        return pdf_bytes, mean_confidence(self._tsv_words(tsv))
+
+    def image_to_data(self, image, lang, tessdata_dir=None):
+        return self._tsv_words(self._run(image, lang, ["tsv"], tessdata_dir)[0])
+
+    def _tsv_words(self, tsv):
+        data = pytesseract.pytesseract.file_to_dict(tsv.decode("utf-8"), '\t', -1)
+        words = []
+        if not data:
+            return words
+        for i, text in enumerate(data["text"]):
+            if data["level"][i] == 5 and text.strip():
+                left, top = data["left"][i], data["top"][i]
+                words.append((data["block_num"][i], data["par_num"][i], data["line_num"][i],
+                              left, top, left + data["width"][i], top + data["height"][i],
+                              float(data["conf"][i]), text.strip()))
+        return words
+
+    def get_languages(self):
+        return pytesseract.get_languages()
+
+class TesserocrBackend:
+    """
+    Keeps Tesseract loaded in-process through the tesserocr binding: the
+    engine and language models are initialised once per process and
+    language and reused for every page and document.
+    """
+    name = "tesserocr"
+    # A page being recognised cannot be interrupted; cancellable runs OCR
+    # in a worker process instead (see PDFConverter._run_ocr_pipeline)
+    killable = False
+
+    def _tessdata_path(self):
+        path = os.environ.get('TESSDATA_PREFIX')
+        if path:
+            return path
+        return tesserocr.get_languages()[0]
+
+    def _get_api(self, lang, tessdata_dir=None):
+        key = (tessdata_dir or self._tessdata_path(), lang)
+        api = _tesserocr_apis.get(key)
+        if api is None:
+            api = tesserocr.PyTessBaseAPI(path=key[0], lang=lang)
+            api.SetVariable("tessedit_create_pdf", "1")
+            _tesserocr_apis[key] = api
+        return api
+
+    def is_available(self):
+        if tesserocr is None:
+            return False
+        try:
+            return bool(tesserocr.get_languages(self._tessdata_path())[1])
+        except Exception:
+            return False
+
+    def image_to_pdf_bytes(self, image, lang, tessdata_dir=None):
+        return self._process_page(image, lang, tessdata_dir, False)[0]
+
+    def image_to_pdf_and_confidence(self, image, lang, tessdata_dir=None):
+        return self._process_page(image, lang, tessdata_dir, True)
+
+    def _process_page(self, image, lang, tessdata_dir, with_confidence):
+        scratch_dir = tempfile.mkdtemp(prefix="pdfconverter_ocr_")
+        try:
+            output_base = os.path.join(scratch_dir, "page")
+            confidence = None
+            with _tesserocr_lock:
+                api = self._get_api(lang, tessdata_dir)
+                if not api.ProcessPage(output_base, image, 0, ""):
+                    raise RuntimeError("tesserocr could not process the page")
+                if with_confidence:
+                    # The page just processed is still loaded in the engine
+                    confidence = float(api.MeanTextConf())
+            with open(output_base + ".pdf", 'rb') as f:
+                return f.read(), confidence
+        finally:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    def image_to_data(self, image, lang, tessdata_dir=None):
+        RIL = tesserocr.RIL
+        words = []
+        block = par = line = 0
+        with _tesserocr_lock:
+            api = self._get_api(lang, tessdata_dir)
+            api.SetImage(image)
+            api.Recognize()
+            for word in tesserocr.iterate_level(api.GetIterator(), RIL.WORD):
+                # Number blocks, paragraphs and lines like Tesseract's TSV output
+                if word.IsAtBeginningOf(RIL.BLOCK):
+                    block, par, line = block + 1, 0, 0
+                if word.IsAtBeginningOf(RIL.PARA):
+                    par, line = par + 1, 0
+                if word.IsAtBeginningOf(RIL.TEXTLINE):
+                    line += 1
+                text = word.GetUTF8Text(RIL.WORD)
+                box = word.BoundingBox(RIL.WORD)
+                if text and text.strip() and box:
+                    words.append((block, par, line) + tuple(box) +
+                                 (word.Confidence(RIL.WORD), text.strip()))
+        return words
+
+    def terminate(self):
+        # In-process engine: the page being recognised runs to the end
+        pass
+
+    def get_languages(self):
+        return tesserocr.get_languages(self._tessdata_path())[1]
 
 class OCREngine:
     def __init__(self, config):
         self.config = config
         self._setup_tesseract_path()
+        self.fallback = PytesseractBackend()
+        self.backend = self._select_backend()
+        # Models used for every page ("" keeps Tesseract's own tessdata)
+        self.fast_tessdata_dir = config.get("ocr_fast_tessdata_dir", "") or None
+        # Tiered OCR: pages the models above read with a mean word
+        # confidence under "ocr_tier_min_confidence" are OCR'd again with
+        # the (slower, more accurate) tessdata_best models
+        self.tiered = config.get("ocr_tiered", False)
+        self.best_tessdata_dir = (config.get("ocr_best_tessdata_dir", "")
+                                  or os.path.join(os.getcwd(), "app", "assets", "tessdata_best"))
+        self.min_confidence = config.get("ocr_tier_min_confidence", 75)
+        self._best_models = {}
+
+    def _select_backend(self):
+        """
+        Picks the OCR backend from the "ocr_backend" setting: "auto" prefers
+        the in-process tesserocr engine and falls back to pytesseract.
+        """
+        choice = self.config.get("ocr_backend", "auto")
+        if choice in ("auto", "tesserocr"):
+            backend = TesserocrBackend()
+            if backend.is_available():
+                return backend
+        return self.fallback
 
     def _setup_tesseract_path(self):
         possible_paths = [
@@ -38,34 +284,175 @@ class OCREngine:
                 found = True
                 break
 
-    def preprocess_image(self, pil_image):
+    def get_preprocess_profile(self, profile=None):
+        profile = profile or self.config.get("ocr_preprocess_profile", DEFAULT_PREPROCESS_PROFILE)
+        if profile not in PREPROCESS_PROFILES:
+            profile = DEFAULT_PREPROCESS_PROFILE
+        return profile
+
+    def best_models_dir(self, lang):
+        """
+        The tessdata dir of the second OCR tier for `lang` (e.g. "por+eng"),
+        or None when tiered OCR is off or the best models for one of the
+        languages are not installed there.
+        """
+        if not self.tiered:
+            return None
+        if lang not in self._best_models:
+            self._best_models[lang] = all(
+                os.path.exists(os.path.join(self.best_tessdata_dir, f"{code}.traineddata"))
+                for code in lang.split("+"))
+        return self.best_tessdata_dir if self._best_models[lang] else None
+
+    def models_key(self, lang):
+        """
+        Identifies the OCR models used for `lang` ("" for the defaults), so
+        cached OCR output is not reused after they change.
+        """
+        parts = []
+        if self.fast_tessdata_dir:
+            parts.append(f"models-{self.fast_tessdata_dir}")
+        best_dir = self.best_models_dir(lang)
+        if best_dir:
+            parts.append(f"best-{best_dir}-{self.min_confidence}")
+        return "-".join(parts)
+
+    def preprocess_key(self, profile=None):
+        """
+        Identifies the preprocessing settings, so cached OCR output is not
+        reused after they change.
+        """
+        return f"profile-{self.get_preprocess_profile(profile)}"
+
+    def preprocess_image(self, image, profile=None):
         """
         Applies advanced preprocessing to remove background and enhance text.
+        Accepts a PIL image or a grayscale NumPy array (e.g. a view over a
+        PyMuPDF pixmap), so the render path can skip the colour conversions.
+        The work done depends on the profile (see PREPROCESS_PROFILES).
         """
-        # Convert PIL to OpenCV
-        img = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
-        
-        # Convert to grayscale
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        
-        # Apply adaptive thresholding to handle uneven lighting/colored backgrounds
-        # This is the key to fixing the "colored background" issue
-        binary = cv2.adaptiveThreshold(
-            gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2
-        )
-        
-        # Denoise
-        denoised = cv2.fastNlMeansDenoising(binary, None, 10, 7, 21)
-        
+        if isinstance(image, np.ndarray) and image.ndim == 2:
+            gray = image
+        else:
+            # Convert PIL to OpenCV
+            img = cv2.cvtColor(np.array(image.convert("RGB")), cv2.COLOR_RGB2BGR)
+
+            # Convert to grayscale
+            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+        profile = self.get_preprocess_profile(profile)
+        if profile == "none":
+            return Image.fromarray(np.ascontiguousarray(gray))
+
+        if profile == "fast":
+            # Global Otsu threshold: one histogram pass, fine for evenly lit scans
+            _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+        else:
+            # Apply adaptive thresholding to handle uneven lighting/colored backgrounds
+            # This is the key to fixing the "colored background" issue
+            binary = cv2.adaptiveThreshold(
+                gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2
+            )
+
+        if profile == "quality":
+            # Denoise
+            denoised = cv2.fastNlMeansDenoising(binary, None, 10, 7, 21)
+        else:
+            # A 3x3 median removes isolated specks from a binary image at a
+            # fraction of the cost of non-local means
+            denoised = cv2.medianBlur(binary, 3)
+
         # Convert back to PIL
         return Image.fromarray(denoised)
 
+    def _run_backend(self, method, image, lang, tessdata_dir, error):
+        """Calls a backend method, falling back to pytesseract. None on failure."""
+        if self.backend is not self.fallback:
+            try:
+                return getattr(self.backend, method)(image, lang, tessdata_dir)
+            except Exception as e:
+                print(f"{self.backend.name} OCR failed ({e}), using pytesseract")
+        try:
+            return getattr(self.fallback, method)(image, lang, tessdata_dir)
+        except Exception as e:
+            print(f"{error}: {e}")
+            return None
+
+    def image_to_pdf_bytes(self, image, lang='por', timings=None):
+        """
+        Runs OCR on an image and returns a single page searchable PDF as bytes,
+        or None on failure. With tiered OCR, a page read with low confidence
+        is OCR'd again with the best models and the more confident result
+        is kept. `timings`, if given, gets the seconds spent in each tier
+        added to it ("ocr", and "ocr_best" when the page was re-run).
+        """
+        start = time.perf_counter()
+        best_dir = self.best_models_dir(lang)
+        if best_dir is None:
+            pdf_bytes = self._run_backend("image_to_pdf_bytes", image, lang,
+                                          self.fast_tessdata_dir, "OCR PDF Generation Error")
+            _add_time(timings, "ocr", start)
+            return pdf_bytes
+
+        result = self._run_backend("image_to_pdf_and_confidence", image, lang,
+                                   self.fast_tessdata_dir, "OCR PDF Generation Error")
+        _add_time(timings, "ocr", start)
+        if result is None:
+            return None
+        pdf_bytes, confidence = result
+        if confidence >= self.min_confidence:
+            return pdf_bytes
+        start = time.perf_counter()
+        best = self._run_backend("image_to_pdf_and_confidence", image, lang,
+                                 best_dir, "OCR PDF Generation Error (best models)")
+        _add_time(timings, "ocr_best", start)
+        if best is not None and best[1] >= confidence:
+            return best[0]
+        return pdf_bytes
+
+    def image_to_data(self, image, lang='por', timings=None):
+        """
+        Runs OCR on an image and returns its words in reading order as
+        (block, paragraph, line, left, top, right, bottom, confidence, text)
+        tuples, with the box in pixels, or None on failure. Used for pages
+        OCR'd in tiles (see app/core/tiling.py) and for building Word
+        documents straight from the OCR layout (see app/core/ocr_docx.py).
+        Tiers and `timings` work as in image_to_pdf_bytes.
+        """
+        start = time.perf_counter()
+        words = self._run_backend("image_to_data", image, lang, self.fast_tessdata_dir, "OCR Error")
+        _add_time(timings, "ocr", start)
+        best_dir = self.best_models_dir(lang)
+        if best_dir is None or words is None:
+            return words
+        confidence = mean_confidence(words)
+        if confidence >= self.min_confidence:
+            return words
+        start = time.perf_counter()
+        best_words = self._run_backend("image_to_data", image, lang, best_dir, "OCR Error (best models)")
+        _add_time(timings, "ocr_best", start)
+        if best_words is not None and mean_confidence(best_words) >= confidence:
+            return best_words
+        return words
+
+    def image_to_layout_bytes(self, image, lang='por', timings=None):
+        """
+        Like image_to_pdf_bytes, but returns the page's OCR layout (see
+        encode_layout) instead of a PDF, or None on failure.
+        """
+        words = self.image_to_data(image, lang, timings)
+        if words is None:
+            return None
+        return encode_layout(image.size, words)
+
     def create_searchable_pdf(self, image, output_path, lang='por'):
         """
         Creates a single page searchable PDF from an image.
         """
+        pdf_bytes = self.image_to_pdf_bytes(image, lang)
+        if pdf_bytes is None:
+            return False
         try:
-            pdf_bytes = pytesseract.image_to_pdf_or_hocr(image, extension='pdf', lang=lang)
             with open(output_path, 'wb') as f:
                 f.write(pdf_bytes)
             return True
@@ -73,15 +460,24 @@ class OCREngine:
             print(f"OCR PDF Generation Error: {e}")
             return False
 
+    def terminate(self):
+        """
+        Kills the OCR subprocesses this engine is running (used on cancel).
+        The engine stays stopped: pages OCR'd afterwards fail.
+        """
+        self.backend.terminate()
+        if self.backend is not self.fallback:
+            self.fallback.terminate()
+
+    def is_killable(self):
+        """True if terminate() interrupts the page being OCR'd."""
+        return self.backend.killable
+
     def get_available_languages(self):
         try:
-            return pytesseract.get_languages()
+            return self.backend.get_languages()
         except:
             return []
 
     def is_available(self):
-        try:
-            pytesseract.get_tesseract_version()
-            return True
-        except:
-            return False
+        return self.backend.is_available() or self.fallback.is_available()
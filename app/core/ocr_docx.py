@@ -0,0 +1,111 @@
+import statistics
+
+from docx import Document
+from docx.enum.section import WD_ORIENT, WD_SECTION
+from docx.shared import Pt
+
+from app.core.layout import decode_layout
+
+class OCRDocxWriter:
+    """
+    Builds a .docx straight from the OCR layout of each page (Tesseract's
+    blocks, paragraphs, lines and word boxes), for documents where every
+    page was OCR'd and "docx_engine" is "ocr_layout". pdf2docx would
+    recover the same text from the searchable PDF at a much higher cost,
+    but it also keeps the page images, which this writer drops (photos,
+    logos and signatures are not in the layout).
+
+    Each OCR paragraph becomes a Word paragraph with its font size taken
+    from the line heights and its indent and spacing from the word boxes;
+    every page starts on a new page, in a new section when its size
+    changes.
+    """
+    def __init__(self, output_path, margin=36):
+        self.output_path = output_path
+        # Page margins in points; the text keeps its position on the page
+        self.margin = margin
+        self.document = Document()
+        self.page_size = None
+        self.page_count = 0
+
+    def append_layout_bytes(self, data, page_rect):
+        """Adds a page from its OCR layout (see app/core/layout.py)."""
+        size, words = decode_layout(data)
+        # Word boxes are in the OCR'd image's pixels (points for tiled pages)
+        scale = page_rect.width / size[0] if size[0] else 1.0
+        # A new section already starts on a new page
+        page_break = not self._start_section(page_rect.width, page_rect.height) and self.page_count > 0
+
+        previous_bottom = None
+        paragraphs = self._paragraphs(words)
+        for lines in paragraphs:
+            paragraph, previous_bottom = self._add_paragraph(lines, scale, previous_bottom)
+            if page_break:
+                paragraph.paragraph_format.page_break_before = True
+                page_break = False
+        if not paragraphs:
+            # Blank page: keep it, so the pages still match the PDF
+            self.document.add_paragraph().paragraph_format.page_break_before = page_break
+        self.page_count += 1
+
+    def _start_section(self, width, height):
+        """Sets up the section for a page. Returns True if a new section was added."""
+        if (width, height) == self.page_size:
+            return False
+        new_section = self.page_size is not None
+        if new_section:
+            section = self.document.add_section(WD_SECTION.NEW_PAGE)
+        else:
+            section = self.document.sections[0]
+        section.orientation = WD_ORIENT.LANDSCAPE if width > height else WD_ORIENT.PORTRAIT
+        section.page_width = Pt(width)
+        section.page_height = Pt(height)
+        for side in ("left_margin", "right_margin", "top_margin", "bottom_margin"):
+            setattr(section, side, Pt(self.margin))
+        self.page_size = (width, height)
+        return new_section
+
+    def _paragraphs(self, words):
+        """Groups the words into paragraphs of lines, in reading order."""
+        paragraphs = {}
+        for block, par, line, left, top, right, bottom, conf, text in words:
+            lines = paragraphs.setdefault((block, par), {})
+            lines.setdefault(line, []).append((left, top, right, bottom, text))
+        return [list(lines.values()) for lines in paragraphs.values()]
+
+    def _add_paragraph(self, lines, scale, previous_bottom):
+        text = ""
+        heights = []
+        for line in lines:
+            line_text = " ".join(word[4] for word in line)
+            heights.append(max(word[3] - word[1] for word in line) * scale)
+            if not text:
+                text = line_text
+            elif text.endswith("-") and len(text) > 1 and line_text[:1].islower():
+                # Join words hyphenated across lines
+                text = text[:-1] + line_text
+            else:
+                text += " " + line_text
+
+        left = min(word[0] for line in lines for word in line) * scale
+        top = min(word[1] for line in lines for word in line) * scale
+        bottom = max(word[3] for line in lines for word in line) * scale
+        # A line's box spans ascenders to descenders, about the font size
+        font_size = min(max(round(statistics.median(heights) * 2) / 2, 6), 48)
+
+        paragraph = self.document.add_paragraph()
+        paragraph_format = paragraph.paragraph_format
+        paragraph_format.space_after = Pt(0)
+        gap = top - (previous_bottom if previous_bottom is not None else self.margin)
+        paragraph_format.space_before = Pt(min(max(gap - font_size * 0.2, 0), 72))
+        indent = left - self.margin
+        if indent > font_size:
+            paragraph_format.left_indent = Pt(indent)
+        run = paragraph.add_run(text)
+        run.font.size = Pt(font_size)
+        return paragraph, bottom
+
+    def close(self):
+        if self.page_count == 0:
+            raise ValueError("No pages were produced")
+        self.document.save(self.output_path)
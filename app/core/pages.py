@@ -0,0 +1,67 @@
+import fitz  # PyMuPDF
+
+def image_coverage(page):
+    """
+    Fraction of the page area covered by images (0.0 - 1.0).
+    """
+    page_rect = page.rect
+    page_area = abs(page_rect)
+    if page_area == 0:
+        return 0.0
+
+    covered = 0.0
+    for info in page.get_image_info():
+        bbox = fitz.Rect(info["bbox"]) & page_rect
+        if not bbox.is_empty:
+            covered += abs(bbox)
+    return min(covered / page_area, 1.0)
+
+def needs_ocr(page, min_text_chars=50, image_threshold=0.5):
+    """
+    Decides whether a page has to go through OCR, using its existing text
+    layer and image coverage:
+    - pages with (almost) no text need OCR;
+    - pages mostly covered by images need OCR unless they already carry
+      a substantial text layer (e.g. a scan that was OCR'd before).
+    Born-digital text pages are passed through untouched.
+    """
+    text_chars = len(page.get_text("text").strip())
+    if text_chars < min_text_chars:
+        return True
+    if image_coverage(page) >= image_threshold:
+        return text_chars < min_text_chars * 10
+    return False
+
+def embedded_image_dpi(page):
+    """
+    Effective resolution of the largest image on the page (usually the
+    scan), or None if the page has no images.
+    """
+    best = None
+    best_area = 0.0
+    for info in page.get_image_info():
+        bbox = fitz.Rect(info["bbox"])
+        if bbox.is_empty or abs(bbox) <= best_area:
+            continue
+        best_area = abs(bbox)
+        # bbox is in points (1/72 inch)
+        best = min(info["width"] / (bbox.width / 72), info["height"] / (bbox.height / 72))
+    return best
+
+def choose_render_dpi(page, target_dpi=150, min_dpi=100, max_pixels=8_000_000):
+    """
+    Picks the DPI to render a page at for OCR: the target DPI, lowered to
+    the resolution of the embedded scan (upsampling adds no detail) and to
+    stay within the pixel budget, but never below min_dpi.
+    """
+    dpi = target_dpi
+    scan_dpi = embedded_image_dpi(page)
+    if scan_dpi:
+        dpi = min(dpi, scan_dpi)
+
+    width_in = page.rect.width / 72
+    height_in = page.rect.height / 72
+    if width_in * height_in * dpi * dpi > max_pixels:
+        dpi = (max_pixels / (width_in * height_in)) ** 0.5
+
+    return max(min_dpi, int(dpi))
@@ -0,0 +1,253 @@
+import threading
+import time
+
+import cv2
+import fitz  # PyMuPDF
+import numpy as np
+
+from app.core.layout import decode_layout, encode_layout
+from app.core.tiling import stitch_text_layer
+
+# Pages are screened on a render this coarse: enough to see text lines,
+# cheap next to the OCR render, preprocessing and Tesseract
+SCREEN_DPI = 36
+# How much darker than the paper around it a pixel must be to count as ink
+INK_LEVEL = 40
+# Share of each side ignored for blank detection (scanner edges, punch holes)
+BLANK_MARGIN = 0.05
+# dHash bits (of 256) that may differ before two pages are compared at all
+MAX_HASH_DISTANCE = 72
+# Largest shift between a page and its duplicate, as a share of the page size
+MAX_SHIFT = 0.05
+# A thumbnail match is confirmed at the default OCR resolution before the
+# earlier page's OCR is reused: there a changed amount or date is a clear
+# difference in ink, not a few grey pixels
+CONFIRM_DPI = 150
+# The pages are compared in tiles of this many pixels (at CONFIRM_DPI),
+# each aligned on its own within CONFIRM_SEARCH pixels, so the skew of a
+# rescan does not add up across the page. The CONFIRM_MARGIN pixels
+# around each tile only help alignment; the tiles overlap by that much.
+CONFIRM_TILE = 128
+CONFIRM_SEARCH = 8
+CONFIRM_MARGIN = 12
+# Earlier pages (best aligned first) a page is confirmed against at most;
+# pages filled in from one template all match each other on the thumbnail
+MAX_CONFIRMS = 2
+
+def ink_image(page, dpi=SCREEN_DPI):
+    """
+    Renders the page at `dpi` and returns how much darker each pixel is
+    than the local paper background (uint8), so uneven lighting and the
+    grey of recycled paper do not count as ink.
+    """
+    pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+    gray = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width]
+    # Closing removes the text, leaving the paper; blurring smooths it out
+    # (a stack blur costs the same for any radius)
+    size = max(3, int(dpi / 6) | 1)
+    background = cv2.morphologyEx(gray, cv2.MORPH_CLOSE, np.ones((size, size), np.uint8))
+    blur = max(3, int(dpi * 0.3) | 1)
+    background = cv2.stackBlur(background, (blur, blur))
+    return cv2.subtract(background, gray)
+
+def ink_coverage(ink, margin=BLANK_MARGIN):
+    """Fraction of the page (without its margins) covered by ink."""
+    height, width = ink.shape
+    dy, dx = int(height * margin), int(width * margin)
+    core = ink[dy:height - dy, dx:width - dx]
+    return float(np.count_nonzero(core > INK_LEVEL)) / core.size if core.size else 0.0
+
+def dhash(ink, size=16):
+    """Perceptual difference hash of the ink image, as a size*size bit int."""
+    small = cv2.resize(ink, (size + 1, size), interpolation=cv2.INTER_AREA).astype(np.int16)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+def alignment(ink_a, ink_b):
+    """
+    How well two thumbnails line up: the phase correlation peak, or 0 if
+    the best shift is too large. Different text in the same layout gives
+    a low peak, a rescan of the same sheet a high one.
+    """
+    if ink_a.shape != ink_b.shape:
+        return 0.0
+    (dx, dy), response = cv2.phaseCorrelate(ink_a.astype(np.float32), ink_b.astype(np.float32))
+    height, width = ink_a.shape
+    if abs(dx) > width * MAX_SHIFT or abs(dy) > height * MAX_SHIFT:
+        return 0.0
+    return response
+
+def ink_difference(ink_a, ink_b):
+    """
+    Largest local difference in ink between two renders of a page (see
+    ink_image), in grey levels. The pages are aligned as a whole, then
+    tile by tile. The difference is blurred with its sign: the edges of
+    slightly misaligned strokes leave light/dark pairs that cancel out,
+    while ink only one page has (a different digit) stays. Rescans of
+    the same sheet stay under 20; a changed character goes over 40.
+    """
+    if ink_a.shape != ink_b.shape:
+        return float("inf")
+    a, b = ink_a.astype(np.float32), ink_b.astype(np.float32)
+    (dx, dy), _ = cv2.phaseCorrelate(a, b)
+    height, width = a.shape
+    tile, search, margin = CONFIRM_TILE, CONFIRM_SEARCH, CONFIRM_MARGIN
+    b = cv2.warpAffine(b, np.float32([[1, 0, -dx], [0, 1, -dy]]), (width, height))
+    # Padded so tiles at the edges can move both ways too
+    b = cv2.copyMakeBorder(b, search, search, search, search, cv2.BORDER_CONSTANT, value=0)
+    worst = 0.0
+    for y in range(0, max(1, height - tile // 2), tile - 2 * margin):
+        for x in range(0, max(1, width - tile // 2), tile - 2 * margin):
+            tile_a = a[y:y + tile, x:x + tile]
+            region = b[y:y + tile_a.shape[0] + 2 * search, x:x + tile_a.shape[1] + 2 * search]
+            offset_x = offset_y = search
+            # Tiles without ink have nothing to align on
+            if tile_a.max() > INK_LEVEL:
+                match = cv2.matchTemplate(region, tile_a, cv2.TM_CCORR_NORMED)
+                _, _, _, (offset_x, offset_y) = cv2.minMaxLoc(match)
+            tile_b = region[offset_y:offset_y + tile_a.shape[0], offset_x:offset_x + tile_a.shape[1]]
+            difference = cv2.GaussianBlur(tile_a - tile_b, (0, 0), 3)
+            core = difference[margin:-margin, margin:-margin]
+            if core.size:
+                worst = max(worst, float(np.abs(core).max()))
+    return worst
+
+def result_words(data, output):
+    """
+    Words of an OCR result (a page's layout or a one page searchable
+    PDF) and the size they are measured against, as (size, words).
+    """
+    if output == "layout":
+        return decode_layout(data)
+    doc = fitz.open("pdf", data)
+    try:
+        page = doc[0]
+        words = [(block, 0, line, x0, y0, x1, y1, 0.0, text)
+                 for x0, y0, x1, y1, text, block, line, _ in page.get_text("words")]
+        return (page.rect.width, page.rect.height), words
+    finally:
+        doc.close()
+
+def reuse_result(data, source_output, page, output):
+    """
+    OCR result for `page` made from the result of a near-duplicate page:
+    its words, scaled to this page, as a layout or over this page's own
+    image as a searchable PDF.
+    """
+    (width, height), words = result_words(data, source_output)
+    scale_x = page.rect.width / width if width else 1.0
+    scale_y = page.rect.height / height if height else 1.0
+    words = [(block, par, line, x0 * scale_x, y0 * scale_y, x1 * scale_x, y1 * scale_y, conf, text)
+             for block, par, line, x0, y0, x1, y1, conf, text in words]
+    if output == "layout":
+        return encode_layout((page.rect.width, page.rect.height), words)
+    return stitch_text_layer(page, words)
+
+class PageScreener:
+    """
+    Skips OCR work on pages that do not need it: blank pages (separator
+    sheets, empty back sides) and near-duplicates of a page OCR'd shortly
+    before (a cover sheet repeated through a batch), whose result is
+    reused. One screener is kept per converter, so duplicates are found
+    across the documents of a batch; it remembers the last
+    "ocr_duplicate_window" pages.
+
+    Duplicates are found on a thumbnail (hash, then phase correlation)
+    and confirmed on renders of both pages at CONFIRM_DPI, so forms
+    filled in from the same template (invoices with different totals)
+    are not taken for each other.
+    """
+    def __init__(self, config):
+        self.skip_blank = config.get("ocr_skip_blank_pages", True)
+        self.blank_max_ink = config.get("ocr_blank_max_ink", 0.0002)
+        self.skip_duplicates = config.get("ocr_skip_duplicate_pages", True)
+        self.min_correlation = config.get("ocr_duplicate_min_correlation", 0.5)
+        self.max_difference = config.get("ocr_duplicate_max_difference", 28)
+        self.window = config.get("ocr_duplicate_window", 64)
+        # (hash, ink image, lang, label, future, output, (path, page
+        # number)) for recently OCR'd pages, newest last; the future
+        # resolves to the page's OCR result, a layout or a searchable PDF
+        # as `output` says. The page is rendered again from its file to
+        # confirm a match.
+        self.pages = []
+        # Seconds of render, preprocess and OCR per page, to estimate the time saved
+        self.ocr_seconds = 0.0
+        self.ocr_count = 0
+        self.lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.skip_blank or self.skip_duplicates
+
+    def start_document(self):
+        """Forgets pages whose OCR did not finish (e.g. a cancelled run)."""
+        with self.lock:
+            self.pages = [entry for entry in self.pages
+                          if entry[4].done() and not entry[4].cancelled() and entry[4].exception() is None]
+
+    def screen(self, page, lang):
+        """
+        Checks a page before it is OCR'd. Returns (kind, match, signature,
+        seconds): kind is "blank", "duplicate" (`match` is (label, future,
+        output) of the earlier page) or "unique" (pass `signature` to
+        remember()).
+        """
+        start = time.perf_counter()
+        ink = ink_image(page)
+        # A page with any text of its own (e.g. just a page number) is kept
+        if (self.skip_blank and ink_coverage(ink) <= self.blank_max_ink
+                and not page.get_text("text").strip()):
+            return "blank", None, None, time.perf_counter() - start
+        if not self.skip_duplicates:
+            return "unique", None, None, time.perf_counter() - start
+
+        page_hash = dhash(ink)
+        with self.lock:
+            candidates = [entry for entry in reversed(self.pages)
+                          if entry[2] == lang and (entry[0] ^ page_hash).bit_count() <= MAX_HASH_DISTANCE]
+        scored = [(alignment(ink, entry[1]), entry) for entry in candidates]
+        scored = [item for item in scored if item[0] >= self.min_correlation]
+        scored.sort(key=lambda item: -item[0])
+        detail = None
+        for _, (_, _, _, label, future, output, location) in scored[:MAX_CONFIRMS]:
+            if detail is None:
+                detail = ink_image(page, CONFIRM_DPI)
+            if self._confirm(page, detail, location):
+                return "duplicate", (label, future, output), None, time.perf_counter() - start
+        location = (page.parent.name, page.number)
+        return "unique", None, (page_hash, ink, lang, location), time.perf_counter() - start
+
+    def _confirm(self, page, detail, location):
+        """Compares `page` (rendered as `detail`) with the earlier page at `location`."""
+        path, number = location
+        if path == page.parent.name:
+            return ink_difference(detail, ink_image(page.parent[number], CONFIRM_DPI)) <= self.max_difference
+        if not path:
+            return False
+        try:
+            doc = fitz.open(path)
+        except Exception:
+            # The earlier document is gone: no way to confirm
+            return False
+        try:
+            return ink_difference(detail, ink_image(doc[number], CONFIRM_DPI)) <= self.max_difference
+        finally:
+            doc.close()
+
+    def remember(self, signature, label, future, output):
+        """Keeps a page that is being OCR'd so later duplicates can reuse its result."""
+        if signature is None or self.window <= 0:
+            return
+        page_hash, ink, lang, location = signature
+        with self.lock:
+            self.pages.append((page_hash, ink, lang, label, future, output, location))
+            del self.pages[:-self.window]
+
+    def record_ocr(self, seconds):
+        with self.lock:
+            self.ocr_seconds += seconds
+            self.ocr_count += 1
+
+    def average_ocr_seconds(self):
+        with self.lock:
+            return self.ocr_seconds / self.ocr_count if self.ocr_count else None
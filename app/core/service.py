@@ -0,0 +1,439 @@
+"""
+Conversion service: runs PDFConverter behind a small HTTP job API so
+several workstations can share one machine's CPUs. Jobs wait in a
+bounded queue and are converted `workers` at a time, each in its own
+process (with its own OCR and pdf2docx processes, as in a batch), so a
+cancelled job can be killed without touching the others. Standard
+library only.
+
+    POST   /jobs?name=a.pdf&ocr=1&lang=por   body: the PDF -> 202, the job
+    GET    /jobs                             all jobs
+    GET    /jobs/<id>?log_from=N             the job, with its log from line N
+    GET    /jobs/<id>/result                 the .docx (409 until done)
+    POST   /jobs/<id>/cancel                 cancels a queued or running job
+    DELETE /jobs/<id>                        cancels it and removes its files
+    GET    /health
+
+With "service_token" set, requests need "Authorization: Bearer <token>".
+The client side is app/core/service_client.py.
+"""
+import json
+import multiprocessing
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from app.core.cancel import CancelToken, init_killable_worker, kill_pool
+from app.core.converter import PDFConverter
+from app.core.metrics import MetricsRecorder, CallbackSink
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+# Set in job worker processes: log lines, page progress and metrics
+# events go back to the service through it while the job runs
+_updates = None
+
+def _init_job_worker(updates, temp_dir):
+    global _updates
+    _updates = updates
+    init_killable_worker(temp_dir)
+
+def convert_job(input_path, output_folder, use_ocr, lang, cpu_budget):
+    """
+    Converts one job inside its worker process. The process is killed
+    (with its OCR and pdf2docx processes) if the job is cancelled.
+    """
+    converter = PDFConverter(logger_callback=lambda message: _updates.put(("log", message)),
+                             ocr_workers=cpu_budget, docx_workers=cpu_budget,
+                             metrics=MetricsRecorder([CallbackSink(lambda event: _updates.put(("event", event)))]),
+                             progress_callback=lambda done, total: _updates.put(("progress", (done, total))))
+    try:
+        success, message = converter.convert(input_path, output_folder, use_ocr, lang)
+    except Exception as e:
+        success, message = False, str(e)
+    # Everything queued reaches the service before the result does
+    _updates.close()
+    _updates.join_thread()
+    return {"success": success, "message": message, "pages": converter.document["pages"]}
+
+class ServiceFull(Exception):
+    """Raised by ConversionService.submit when the job queue is full."""
+
+class Job:
+    """A submitted document and the state of its conversion."""
+    def __init__(self, job_dir, name, use_ocr, lang):
+        self.id = os.path.basename(job_dir)
+        self.dir = job_dir
+        self.name = name
+        self.input_path = os.path.join(job_dir, name)
+        self.output_path = None
+        self.use_ocr = use_ocr
+        self.lang = lang
+        self.status = QUEUED
+        self.message = ""
+        self.pages_done = 0
+        self.pages_total = 0
+        self.log = []
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.cancel_token = CancelToken()
+
+    def to_dict(self, log_from=0):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "status": self.status,
+            "message": self.message,
+            "use_ocr": self.use_ocr,
+            "lang": self.lang,
+            "pages_done": self.pages_done,
+            "pages_total": self.pages_total,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "log_from": log_from,
+            "log": self.log[log_from:],
+        }
+
+class ConversionService:
+    """
+    Job queue and worker pool behind the HTTP API. At most `max_queued`
+    jobs wait; `workers` documents are converted at once, each with an
+    equal share of the CPUs for OCR and pdf2docx. Finished jobs and their
+    files are kept for "service_job_ttl_seconds", then removed.
+    """
+    def __init__(self, config, workers=None, work_dir=None, logger_callback=None, metrics=None):
+        self.config = config
+        if workers is None:
+            workers = config.get("service_workers", 0)
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.cpu_budget = max(1, (os.cpu_count() or 1) // self.workers)
+        self.max_queued = config.get("service_max_queued", 1000)
+        self.job_ttl = config.get("service_job_ttl_seconds", 3600)
+        # Uploads and results, one subdirectory per job
+        self.work_dir = tempfile.mkdtemp(prefix="pdfconverter_service_", dir=work_dir)
+        self.logger_callback = logger_callback
+        self.metrics = metrics
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.queue = queue.Queue()
+        self.threads = []
+
+    def log(self, message):
+        if self.logger_callback:
+            self.logger_callback(message)
+        else:
+            print(message)
+
+    def start(self):
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        self.log(f"Conversion service: {self.workers} documents at a time, "
+                 f"{self.cpu_budget} CPUs each")
+
+    def stop(self):
+        """Cancels every job, waits for the workers and removes the job files."""
+        with self.lock:
+            jobs = list(self.jobs.values())
+        for job in jobs:
+            job.cancel_token.cancel()
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def submit(self, name, stream, length, use_ocr=False, lang="por"):
+        """
+        Queues a conversion of the PDF read from `stream` (`length`
+        bytes). Raises ServiceFull if the queue is full.
+        """
+        self.purge()
+        with self.lock:
+            queued = sum(1 for job in self.jobs.values() if job.status == QUEUED)
+        if queued >= self.max_queued:
+            raise ServiceFull(f"Queue is full ({queued} jobs waiting)")
+
+        name = os.path.basename(name.replace("\\", "/")) or "document.pdf"
+        if not name.lower().endswith(".pdf"):
+            name += ".pdf"
+        job_dir = os.path.join(self.work_dir, uuid.uuid4().hex)
+        os.makedirs(job_dir)
+        job = Job(job_dir, name, use_ocr, lang)
+        try:
+            with open(job.input_path, 'wb') as f:
+                remaining = length
+                while remaining > 0:
+                    chunk = stream.read(min(remaining, 1024 * 1024))
+                    if not chunk:
+                        raise ValueError("Upload ended early")
+                    f.write(chunk)
+                    remaining -= len(chunk)
+        except Exception:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            raise
+
+        with self.lock:
+            self.jobs[job.id] = job
+        self.queue.put(job)
+        self.log(f"Queued {job.id}: {name}")
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def list(self):
+        with self.lock:
+            return sorted(self.jobs.values(), key=lambda job: job.created)
+
+    def cancel(self, job_id):
+        """Cancels a queued or running job. Returns the job (None if unknown)."""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        with self.lock:
+            queued = job.status == QUEUED
+            if queued:
+                # The worker that dequeues it skips it
+                self._finish(job, CANCELLED, "Cancelled")
+        if queued:
+            self.log(f"Cancelled {job.id}: {job.name}")
+        job.cancel_token.cancel()
+        return job
+
+    def delete(self, job_id):
+        """Cancels a job and removes it and its files. Returns False if unknown."""
+        job = self.cancel(job_id)
+        if job is None:
+            return False
+        with self.lock:
+            self.jobs.pop(job_id, None)
+        # A running job's files go once its conversion has stopped
+        if job.status in FINISHED:
+            shutil.rmtree(job.dir, ignore_errors=True)
+        return True
+
+    def purge(self):
+        """Removes finished jobs older than the TTL."""
+        now = time.time()
+        with self.lock:
+            expired = [job for job in self.jobs.values()
+                       if job.status in FINISHED and now - job.finished > self.job_ttl]
+            for job in expired:
+                del self.jobs[job.id]
+        for job in expired:
+            shutil.rmtree(job.dir, ignore_errors=True)
+
+    def counts(self):
+        counts = {}
+        with self.lock:
+            for job in self.jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+        return counts
+
+    def _finish(self, job, status, message):
+        job.status = status
+        job.message = message
+        job.finished = time.time()
+
+    def _worker_loop(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                return
+            with self.lock:
+                if job.status != QUEUED:
+                    continue
+                job.status = RUNNING
+                job.started = time.time()
+            self._run(job)
+
+    def _run(self, job):
+        updates = multiprocessing.Queue()
+        # Killed workers cannot clean up after themselves: their temporary
+        # files go to the job's directory
+        temp_dir = os.path.join(job.dir, "tmp")
+        os.makedirs(temp_dir, exist_ok=True)
+        try:
+            with ProcessPoolExecutor(max_workers=1, initializer=_init_job_worker,
+                                     initargs=(updates, temp_dir)) as executor:
+                future = executor.submit(convert_job, job.input_path, job.dir,
+                                         job.use_ocr, job.lang, self.cpu_budget)
+                kill = lambda: kill_pool(executor)
+                job.cancel_token.add_callback(kill)
+                try:
+                    self._forward_updates(job, updates, future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = {"success": False, "message": str(e), "pages": 0}
+                finally:
+                    job.cancel_token.remove_callback(kill)
+        finally:
+            updates.close()
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+        with self.lock:
+            job.pages_total = job.pages_total or result["pages"]
+            if job.cancel_token.is_cancelled():
+                self._finish(job, CANCELLED, "Cancelled")
+            elif result["success"]:
+                job.output_path = result["message"]
+                self._finish(job, DONE, "")
+            else:
+                self._finish(job, FAILED, result["message"])
+            removed = job.id not in self.jobs
+        if removed:
+            shutil.rmtree(job.dir, ignore_errors=True)
+        self.log(f"{job.status.capitalize()} {job.id}: {job.name} "
+                 f"({job.finished - job.started:.1f} s)")
+
+    def _forward_updates(self, job, updates, future):
+        """Applies the worker's log lines, progress and metrics events until it exits."""
+        while True:
+            try:
+                kind, value = updates.get(timeout=0.2)
+            except queue.Empty:
+                # The worker flushes the queue before returning; a killed one sends nothing more
+                if future.done():
+                    return
+                continue
+            if kind == "log":
+                job.log.append(value)
+            elif kind == "progress":
+                job.pages_done, job.pages_total = value
+            elif kind == "event" and self.metrics:
+                self.metrics.replay(value)
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    server_version = "PDFConverterService/1.0"
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def log_message(self, format, *args):
+        # Job events are logged by the service; skip the per-request lines
+        pass
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def _dispatch(self, method):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        parts = [part for part in url.path.split("/") if part]
+        if not self._authorized():
+            return self._send_json(401, {"error": "Unauthorized"})
+        try:
+            if parts == ["health"] and method == "GET":
+                return self._send_json(200, {"status": "ok", "workers": self.service.workers,
+                                             "jobs": self.service.counts()})
+            if parts == ["jobs"] and method == "GET":
+                self.service.purge()
+                return self._send_json(200, {"jobs": [job.to_dict(len(job.log))
+                                                      for job in self.service.list()]})
+            if parts == ["jobs"] and method == "POST":
+                return self._submit(params)
+            if len(parts) >= 2 and parts[0] == "jobs":
+                return self._job_request(method, parts[1], parts[2:], params)
+            self._send_json(404, {"error": "Not found"})
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+
+    def _submit(self, params):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0:
+            return self._send_json(411, {"error": "The PDF must be sent with a Content-Length"})
+        max_bytes = self.service.config.get("service_max_upload_mb", 500) * 1024 * 1024
+        if length > max_bytes:
+            self.close_connection = True
+            return self._send_json(413, {"error": "File too large"})
+        try:
+            job = self.service.submit(
+                params.get("name", ["document.pdf"])[0],
+                self.rfile,
+                length,
+                use_ocr=params.get("ocr", ["0"])[0] == "1",
+                lang=params.get("lang", ["por"])[0]
+            )
+        except ServiceFull as e:
+            self.close_connection = True
+            return self._send_json(503, {"error": str(e)})
+        self._send_json(202, job.to_dict())
+
+    def _job_request(self, method, job_id, rest, params):
+        job = self.service.get(job_id)
+        if job is None:
+            return self._send_json(404, {"error": "Unknown job"})
+        if not rest and method == "GET":
+            log_from = int(params.get("log_from", ["0"])[0])
+            return self._send_json(200, job.to_dict(log_from))
+        if not rest and method == "DELETE":
+            self.service.delete(job_id)
+            return self._send_json(200, job.to_dict(len(job.log)))
+        if rest == ["cancel"] and method == "POST":
+            self.service.cancel(job_id)
+            return self._send_json(200, job.to_dict(len(job.log)))
+        if rest == ["result"] and method == "GET":
+            if job.status != DONE:
+                return self._send_json(409, {"error": f"Job is {job.status}"})
+            return self._send_file(job.output_path)
+        self._send_json(404, {"error": "Not found"})
+
+    def _authorized(self):
+        token = self.service.config.get("service_token", "")
+        return not token or self.headers.get("Authorization") == f"Bearer {token}"
+
+    def _send_json(self, status, data):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_file(self, path):
+        self.send_response(200)
+        self.send_header("Content-Type",
+                         "application/vnd.openxmlformats-officedocument.wordprocessingml.document")
+        self.send_header("Content-Length", str(os.path.getsize(path)))
+        self.end_headers()
+        with open(path, 'rb') as f:
+            shutil.copyfileobj(f, self.wfile)
+
+class ServiceServer(ThreadingHTTPServer):
+    """HTTP server for a ConversionService. Port 0 picks a free port."""
+    daemon_threads = True
+
+    def __init__(self, service, host="127.0.0.1", port=8765):
+        self.service = service
+        super().__init__((host, port), ServiceRequestHandler)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
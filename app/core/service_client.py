@@ -0,0 +1,81 @@
+"""
+Client for the conversion service (app/core/service.py). Standard
+library only, and it does not import the converter, so the window can
+hand its files to a shared machine without loading pdf2docx or OpenCV.
+"""
+import json
+import os
+import shutil
+import urllib.error
+import urllib.request
+from urllib.parse import quote, urlencode
+
+class ServiceError(Exception):
+    """A request to the conversion service failed."""
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+class ServiceClient:
+    def __init__(self, url, token="", timeout=30):
+        self.url = url.rstrip("/")
+        self.token = token
+        self.timeout = timeout
+
+    def _request(self, method, path, data=None, headers=None):
+        request = urllib.request.Request(self.url + path, data=data, method=method,
+                                         headers=dict(headers or {}))
+        if self.token:
+            request.add_header("Authorization", f"Bearer {self.token}")
+        try:
+            return urllib.request.urlopen(request, timeout=self.timeout)
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read()).get("error", e.reason)
+            except (ValueError, AttributeError):
+                message = e.reason
+            raise ServiceError(f"{method} {path}: {message}", e.code) from None
+        except OSError as e:
+            raise ServiceError(f"Conversion service unreachable at {self.url}: {e}") from None
+
+    def _json(self, method, path, data=None, headers=None):
+        with self._request(method, path, data, headers) as response:
+            return json.loads(response.read())
+
+    def health(self):
+        return self._json("GET", "/health")
+
+    def submit(self, file_path, use_ocr=False, lang="por"):
+        """Uploads a PDF and queues its conversion. Returns the job."""
+        query = urlencode({"name": os.path.basename(file_path), "ocr": int(bool(use_ocr)), "lang": lang})
+        with open(file_path, 'rb') as f:
+            headers = {"Content-Type": "application/pdf",
+                       "Content-Length": str(os.path.getsize(file_path))}
+            return self._json("POST", f"/jobs?{query}", f, headers)
+
+    def status(self, job_id, log_from=0):
+        """The job, with its log lines from `log_from` on."""
+        return self._json("GET", f"/jobs/{quote(job_id)}?log_from={int(log_from)}")
+
+    def jobs(self):
+        return self._json("GET", "/jobs")["jobs"]
+
+    def download(self, job_id, output_path):
+        """Saves a finished job's .docx to `output_path`."""
+        partial_path = output_path + ".part"
+        try:
+            with self._request("GET", f"/jobs/{quote(job_id)}/result") as response:
+                with open(partial_path, 'wb') as f:
+                    shutil.copyfileobj(response, f)
+            os.replace(partial_path, output_path)
+        finally:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+        return output_path
+
+    def cancel(self, job_id):
+        return self._json("POST", f"/jobs/{quote(job_id)}/cancel")
+
+    def delete(self, job_id):
+        """Cancels the job if needed and removes it from the service."""
+        return self._json("DELETE", f"/jobs/{quote(job_id)}")
@@ -0,0 +1,153 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import fitz  # PyMuPDF
+
+_STOP = object()
+
+class IncrementalPDFWriter:
+    """
+    Builds a PDF on disk page by page. Every `flush_every` pages the
+    pending pages are written with an incremental save and the document is
+    reopened from disk, so memory does not grow with the page count.
+    """
+    def __init__(self, output_path, flush_every=32):
+        self.output_path = output_path
+        self.flush_every = max(1, flush_every)
+        self.doc = fitz.open()
+        self.saved = False
+        self.pending = 0
+        self.page_count = 0
+
+    def append_pdf_bytes(self, pdf_bytes):
+        with fitz.open(stream=pdf_bytes, filetype="pdf") as page_pdf:
+            self.doc.insert_pdf(page_pdf)
+        self._appended()
+
+    def append_page(self, source_doc, page_index):
+        self.doc.insert_pdf(source_doc, from_page=page_index, to_page=page_index)
+        self._appended()
+
+    def _appended(self):
+        self.pending += 1
+        self.page_count += 1
+        if self.pending >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        if self.saved:
+            self.doc.saveIncr()
+        else:
+            self.doc.save(self.output_path)
+            self.saved = True
+        # Reopening drops the pages we just wrote from memory
+        self.doc.close()
+        self.doc = fitz.open(self.output_path)
+        self.pending = 0
+
+    def close(self):
+        try:
+            if self.page_count == 0:
+                raise ValueError("No pages were produced")
+            self.flush()
+        finally:
+            self.doc.close()
+
+class OCRStages:
+    """
+    Preprocess and OCR stages running on their own threads, connected by
+    queues. The caller renders pages and submits them; each submission
+    returns a Future that completes when the page's OCR is done. Both
+    OpenCV and Tesseract release the GIL, so rendering the next page,
+    preprocessing and OCR overlap. The number of pages in flight is
+    bounded by the caller (see PDFConverter._run_ocr_pipeline).
+
+    PyMuPDF is not thread-safe: only NumPy arrays cross into the stage
+    threads, all fitz calls stay on the caller's thread.
+
+    With output="layout" pages are OCR'd to their layout (see
+    app/core/layout.py) instead of a searchable PDF.
+    """
+    def __init__(self, ocr_engine, lang, page_cache=None, output="pdf"):
+        self.ocr_engine = ocr_engine
+        self.lang = lang
+        self.page_cache = page_cache
+        self.output = output
+        self.cancelled = False
+        self.preprocess_queue = queue.Queue()
+        self.ocr_queue = queue.Queue()
+        self.threads = [
+            threading.Thread(target=self._preprocess_loop, daemon=True),
+            threading.Thread(target=self._ocr_loop, daemon=True),
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, gray, cache_key=None, timings=None):
+        """
+        Queues a page. The future resolves to (pdf_bytes, "ocr", timings),
+        where `timings` gets the seconds spent in each stage added to it.
+        """
+        future = Future()
+        timings = {} if timings is None else timings
+        self.preprocess_queue.put((gray, cache_key, timings, future))
+        return future
+
+    def _preprocess_loop(self):
+        while True:
+            item = self.preprocess_queue.get()
+            if item is _STOP:
+                self.ocr_queue.put(_STOP)
+                return
+            gray, cache_key, timings, future = item
+            if self.cancelled:
+                future.cancel()
+                continue
+            try:
+                start = time.perf_counter()
+                processed = self.ocr_engine.preprocess_image(gray)
+                timings["preprocess"] = time.perf_counter() - start
+            except Exception as e:
+                future.set_exception(e)
+                continue
+            self.ocr_queue.put((processed, cache_key, timings, future))
+
+    def _ocr_loop(self):
+        while True:
+            item = self.ocr_queue.get()
+            if item is _STOP:
+                return
+            processed, cache_key, timings, future = item
+            if self.cancelled:
+                future.cancel()
+                continue
+            try:
+                if self.output == "layout":
+                    pdf_bytes = self.ocr_engine.image_to_layout_bytes(processed, self.lang, timings)
+                else:
+                    pdf_bytes = self.ocr_engine.image_to_pdf_bytes(processed, self.lang, timings)
+                if cache_key and pdf_bytes:
+                    try:
+                        self.page_cache.put_bytes(cache_key, pdf_bytes)
+                    except OSError as e:
+                        print(f"Page cache write error: {e}")
+            except Exception as e:
+                future.set_exception(e)
+                continue
+            future.set_result((pdf_bytes, "ocr", timings))
+
+    def cancel(self):
+        """
+        Skips the pages still queued (their futures are cancelled). The
+        pages already in a stage finish; close() waits for them.
+        """
+        self.cancelled = True
+
+    def close(self):
+        self.preprocess_queue.put(_STOP)
+        for thread in self.threads:
+            thread.join()
@@ -0,0 +1,136 @@
+import math
+import time
+
+import fitz  # PyMuPDF
+import numpy as np
+
+from app.core.layout import encode_layout
+
+def page_pixels(page, dpi):
+    """Pixels in a full render of the page at `dpi`."""
+    return (page.rect.width / 72 * dpi) * (page.rect.height / 72 * dpi)
+
+def _spans(start, length, tile, overlap):
+    """
+    Splits [start, start + length] into the fewest spans of at most `tile`
+    that overlap by `overlap`. Returns (span, core) pairs: the cores split
+    every overlap down the middle, so they tile the range exactly once.
+    """
+    count = 1 if length <= tile else math.ceil((length - overlap) / (tile - overlap))
+    size = (length + (count - 1) * overlap) / count
+    spans = []
+    for n in range(count):
+        lo = start + n * (size - overlap)
+        hi = lo + size
+        core_lo = lo + overlap / 2 if n > 0 else start
+        core_hi = hi - overlap / 2 if n < count - 1 else start + length
+        spans.append(((lo, hi), (core_lo, core_hi)))
+    return spans
+
+def page_tiles(page, dpi, max_pixels=8_000_000, overlap_px=256):
+    """
+    Clip regions for OCR'ing a page that is over the pixel budget at
+    `dpi` in pieces, or None if the whole page fits. Each tile is a
+    (clip, core) pair of (x0, y0, x1, y1) tuples in points: `clip` is
+    rendered (at most `max_pixels`) and words whose centre falls in
+    `core` are kept, so text in the overlaps is not duplicated.
+    """
+    if page_pixels(page, dpi) <= max_pixels:
+        return None
+
+    rect = page.rect
+    tile = math.sqrt(max_pixels) * 72 / dpi
+    # A word cut at the edge of one tile is whole in the next as long as it
+    # is narrower than half the overlap
+    overlap = min(overlap_px * 72 / dpi, tile / 2)
+    tiles = []
+    for (y0, y1), (core_y0, core_y1) in _spans(rect.y0, rect.height, tile, overlap):
+        for (x0, x1), (core_x0, core_x1) in _spans(rect.x0, rect.width, tile, overlap):
+            tiles.append(((x0, y0, x1, y1), (core_x0, core_y0, core_x1, core_y1)))
+    return tiles
+
+def ocr_page_tiled(ocr_engine, page, lang, dpi, tiles, output="pdf", cancel_token=None):
+    """
+    OCRs an oversized page one tile at a time and stitches the words back
+    into a single searchable page: a copy of the original page with an
+    invisible text layer on top. Only one tile's pixels are in memory at
+    a time, however large the page is. Returns (pdf_bytes, "ocr",
+    timings) like _ocr_page, with pdf_bytes None if OCR failed. With
+    output="layout" the page's OCR layout (in points) is returned instead.
+    A `cancel_token` is checked between tiles. With tiered OCR, only the
+    tiles read with low confidence are re-run with the best models.
+    """
+    timings = {"render": 0.0, "preprocess": 0.0, "ocr": 0.0}
+    scale = 72 / dpi
+    words = []
+    for tile_index, (clip, core) in enumerate(tiles):
+        if cancel_token is not None:
+            cancel_token.check()
+        start = time.perf_counter()
+        pix = page.get_pixmap(dpi=dpi, clip=fitz.Rect(clip), colorspace=fitz.csGRAY, alpha=False)
+        timings["render"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        gray = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width]
+        processed_image = ocr_engine.preprocess_image(gray)
+        timings["preprocess"] += time.perf_counter() - start
+
+        tile_words = ocr_engine.image_to_data(processed_image, lang, timings)
+        # The pixmap knows where its top left corner is on the page
+        origin_x, origin_y = pix.x * scale, pix.y * scale
+        # Free this tile before the next one is rendered
+        del pix, gray, processed_image
+        if tile_words is None:
+            return None, "ocr", timings
+
+        core_x0, core_y0, core_x1, core_y1 = core
+        for block, par, line, left, top, right, bottom, conf, text in tile_words:
+            x0, y0 = origin_x + left * scale, origin_y + top * scale
+            x1, y1 = origin_x + right * scale, origin_y + bottom * scale
+            center_x, center_y = (x0 + x1) / 2, (y0 + y1) / 2
+            if core_x0 <= center_x < core_x1 and core_y0 <= center_y < core_y1:
+                # Blocks are numbered per tile; keep them apart across tiles
+                words.append((tile_index * 10000 + block, par, line, x0, y0, x1, y1, conf, text))
+
+    start = time.perf_counter()
+    if output == "layout":
+        pdf_bytes = encode_layout((page.rect.width, page.rect.height), words)
+    else:
+        pdf_bytes = stitch_text_layer(page, words)
+    timings["stitch"] = time.perf_counter() - start
+    return pdf_bytes, "ocr", timings
+
+def stitch_text_layer(page, words):
+    """
+    Copies the page into a new one-page PDF and writes `words` (boxes in
+    points, as displayed) over it as invisible text, each word sized to
+    its box. Also used for pages that reuse a duplicate's OCR result.
+    """
+    doc = fitz.open()
+    try:
+        doc.insert_pdf(page.parent, from_page=page.number, to_page=page.number)
+        out_page = doc[0]
+        # Tiles are rendered as displayed; drop /Rotate so the word boxes
+        # are in page coordinates
+        if out_page.rotation:
+            out_page.remove_rotation()
+        # Keep the page's own graphics state (e.g. the derotation) from
+        # leaking into the text layer
+        if not out_page.is_wrapped:
+            out_page.wrap_contents()
+        font = fitz.Font("helv")
+        writer = fitz.TextWriter(out_page.rect)
+        for _, _, _, x0, y0, x1, y1, _, text in words:
+            width = font.text_length(text, fontsize=1)
+            if width <= 0:
+                continue
+            fontsize = min((x1 - x0) / width, (y1 - y0) * 1.5)
+            if fontsize <= 0:
+                continue
+            # Baseline at the bottom of the box, above the descenders
+            writer.append((x0, y1 - (y1 - y0) * 0.2), text, font=font, fontsize=fontsize)
+        # render_mode 3: invisible, searchable and selectable (like Tesseract's PDFs)
+        writer.write_text(out_page, render_mode=3)
+        return doc.tobytes(garbage=3, deflate=True)
+    finally:
+        doc.close()
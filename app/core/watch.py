@@ -0,0 +1,259 @@
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from app.core.batch import convert_document
+
+class JobQueue:
+    """
+    Persistent queue of conversion jobs in a SQLite file. A file is queued
+    once per (path, size, mtime), so restarts neither lose nor redo work
+    and a changed file is converted again.
+    """
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                output TEXT,
+                error TEXT,
+                created REAL NOT NULL,
+                updated REAL NOT NULL,
+                UNIQUE (path, size, mtime)
+            )
+        """)
+        self.db.commit()
+
+    def add(self, path, size, mtime):
+        """Queues a file. Returns False if this version was already queued."""
+        now = time.time()
+        with self.lock:
+            cursor = self.db.execute(
+                "INSERT OR IGNORE INTO jobs (path, size, mtime, created, updated) VALUES (?, ?, ?, ?, ?)",
+                (path, size, mtime, now, now)
+            )
+            self.db.commit()
+            return cursor.rowcount > 0
+
+    def claim(self, limit):
+        """Marks up to `limit` pending jobs as running and returns (id, path) pairs."""
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT id, path FROM jobs WHERE status = 'pending' ORDER BY id LIMIT ?",
+                (limit,)
+            ).fetchall()
+            self.db.executemany(
+                "UPDATE jobs SET status = 'running', updated = ? WHERE id = ?",
+                [(time.time(), job_id) for job_id, _ in rows]
+            )
+            self.db.commit()
+            return rows
+
+    def complete(self, job_id, success, message):
+        with self.lock:
+            if success:
+                self.db.execute(
+                    "UPDATE jobs SET status = 'done', output = ?, error = NULL, updated = ? WHERE id = ?",
+                    (message, time.time(), job_id)
+                )
+            else:
+                self.db.execute(
+                    "UPDATE jobs SET status = 'failed', error = ?, updated = ? WHERE id = ?",
+                    (message, time.time(), job_id)
+                )
+            self.db.commit()
+
+    def recover(self):
+        """
+        Puts jobs that were running when the process died back in the
+        queue. Returns how many were recovered.
+        """
+        with self.lock:
+            cursor = self.db.execute(
+                "UPDATE jobs SET status = 'pending', updated = ? WHERE status = 'running'",
+                (time.time(),)
+            )
+            self.db.commit()
+            return cursor.rowcount
+
+    def counts(self):
+        with self.lock:
+            rows = self.db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+class FolderWatcher:
+    """
+    Polls input folders for PDFs and reports each one once its size and
+    mtime have not changed for `settle_seconds` (i.e. the scanner or copy
+    finished writing it).
+    """
+    def __init__(self, folders, settle_seconds=5.0):
+        self.folders = folders
+        self.settle_seconds = settle_seconds
+        # path -> [size, mtime, time first seen with that size/mtime, reported]
+        self.candidates = {}
+
+    def scan(self):
+        """Returns (path, size, mtime) for files that became stable."""
+        now = time.monotonic()
+        stable = []
+        seen = set()
+        for folder in self.folders:
+            try:
+                entries = list(os.scandir(folder))
+            except OSError:
+                continue
+            for entry in entries:
+                if not entry.is_file() or not entry.name.lower().endswith('.pdf'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                path = os.path.abspath(entry.path)
+                seen.add(path)
+                signature = [stat.st_size, stat.st_mtime]
+                candidate = self.candidates.get(path)
+                if candidate is None or candidate[:2] != signature:
+                    self.candidates[path] = signature + [now, False]
+                elif not candidate[3] and now - candidate[2] >= self.settle_seconds and stat.st_size > 0:
+                    # Reported once per version; the JobQueue dedups across restarts
+                    candidate[3] = True
+                    stable.append((path, stat.st_size, stat.st_mtime))
+
+        # Forget files that were removed
+        for path in list(self.candidates):
+            if path not in seen:
+                del self.candidates[path]
+        return stable
+
+def watch_output_folders(folders, output_folder):
+    """
+    Output folder of each watched folder. A single folder writes straight
+    into `output_folder`; several get a subfolder each, named after them
+    (numbered when names repeat), so same-named PDFs in different folders
+    do not overwrite each other's output.
+    """
+    folders = [os.path.abspath(folder) for folder in folders]
+    if len(folders) == 1:
+        return {folders[0]: output_folder}
+    outputs = {}
+    used = set()
+    for folder in folders:
+        name = os.path.basename(folder.rstrip(os.sep)) or "input"
+        candidate, n = name, 1
+        while os.path.normcase(candidate) in used:
+            n += 1
+            candidate = f"{name}_{n}"
+        used.add(os.path.normcase(candidate))
+        outputs[folder] = os.path.join(output_folder, candidate)
+    return outputs
+
+class WatchService:
+    """
+    Hot-folder mode: watches input folders, queues stable PDFs in a
+    persistent JobQueue and converts them continuously with up to
+    `concurrency` documents at a time. With several folders, each one's
+    output goes to its own subfolder (see watch_output_folders). After a crash, jobs that were
+    running are picked up again on the next start. Setting `stop_event`
+    (or calling stop()) stops it, even before run() is called.
+    """
+    def __init__(self, config, folders, output_folder, use_ocr=False, lang='por',
+                 concurrency=None, logger_callback=None, result_callback=None, metrics=None,
+                 stop_event=None):
+        self.config = config
+        self.output_folder = output_folder
+        self.output_folders = watch_output_folders(folders, output_folder)
+        self.use_ocr = use_ocr
+        self.lang = lang
+        self.logger_callback = logger_callback
+        self.result_callback = result_callback
+        # Receives the metrics events of every converted document
+        self.metrics = metrics
+        if concurrency is None:
+            concurrency = config.get("watch_concurrency", 0)
+        self.concurrency = max(1, concurrency or os.cpu_count() or 1)
+        self.poll_seconds = config.get("watch_poll_seconds", 2.0)
+        self.watcher = FolderWatcher(folders, config.get("watch_settle_seconds", 5.0))
+        self.queue = JobQueue(os.path.join(config.config_dir, "watch_queue.sqlite3"))
+        self.stop_event = stop_event or threading.Event()
+
+    def log(self, message):
+        if self.logger_callback:
+            self.logger_callback(message)
+        else:
+            print(message)
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self):
+        """Runs until stop() is called."""
+        recovered = self.queue.recover()
+        if recovered:
+            self.log(f"Resuming {recovered} interrupted jobs")
+        self.log(f"Watching {', '.join(self.watcher.folders)} ({self.concurrency} at a time)")
+
+        cpu_budget = max(1, (os.cpu_count() or 1) // self.concurrency)
+        running = {}
+        try:
+            with ProcessPoolExecutor(max_workers=self.concurrency) as executor:
+                while not self.stop_event.is_set():
+                    for path, size, mtime in self.watcher.scan():
+                        if self.queue.add(path, size, mtime):
+                            self.log(f"Queued: {path}")
+
+                    free = self.concurrency - len(running)
+                    if free > 0:
+                        for job_id, path in self.queue.claim(free):
+                            future = executor.submit(convert_document, path, self._output_for(path),
+                                                     self.use_ocr, self.lang, cpu_budget)
+                            running[future] = job_id
+
+                    if running:
+                        done, _ = wait(running, timeout=self.poll_seconds, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            self._finish(running.pop(future), future)
+                    else:
+                        self.stop_event.wait(self.poll_seconds)
+
+                # Let running conversions finish so their jobs are recorded
+                for future in list(running):
+                    future.exception()
+                    self._finish(running.pop(future), future)
+        finally:
+            self.queue.close()
+        self.log("Watch mode stopped")
+
+    def _output_for(self, path):
+        # Jobs recovered from folders no longer watched go to the output root
+        folder = self.output_folders.get(os.path.dirname(path), self.output_folder)
+        os.makedirs(folder, exist_ok=True)
+        return folder
+
+    def _finish(self, job_id, future):
+        try:
+            result = future.result()
+        except Exception as e:
+            result = {"file": None, "success": False, "message": str(e),
+                      "duration": 0.0, "log": [], "events": []}
+        self.queue.complete(job_id, result["success"], result["message"])
+        for message in result["log"]:
+            self.log(message)
+        if self.metrics:
+            for event in result["events"]:
+                self.metrics.replay(event)
+        if self.result_callback:
+            self.result_callback(result)
@@ -1,28 +1,44 @@
 from PySide6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-                               QPushButton, QListWidget, QFileDialog, QProgressBar, 
-                               QTextEdit, QLabel, QComboBox, QCheckBox, QGroupBox, QSplitter)
-from PySide6.QtCore import Qt
+                               QPushButton, QTableView, QHeaderView, QAbstractItemView,
+                               QFileDialog, QProgressBar, QLabel, QComboBox, QCheckBox,
+                               QGroupBox, QSplitter)
+from PySide6.QtCore import Qt, QTimer
 from PySide6.QtGui import QIcon
 import os
+import time
 
-from app.ui.widgets import DragDropWidget
-from app.ui.workers import ConversionWorker
+from app.ui.widgets import DragDropWidget, LogView
+from app.ui.models import FileQueueModel
+from app.ui.workers import ConversionWorker, TesseractProbeWorker, WatchWorker, FolderScanWorker
 from app.utils.i18n import I18n
-from app.core.ocr import OCREngine
+from app.core.config import PREPROCESS_PROFILES, DEFAULT_PREPROCESS_PROFILE
 
 class MainWindow(QMainWindow):
     def __init__(self, config):
         super().__init__()
         self.config = config
         self.i18n = I18n(self.config.get("language", "pt_BR"))
-        self.ocr_engine = OCREngine(self.config)
+        # None until the background Tesseract probe finishes
+        self.ocr_available = None
         
-        self.files_to_convert = []
+        self.file_model = FileQueueModel(self.i18n)
+        self.scan_workers = []
         self.worker = None
+        self.watch_worker = None
+        self.max_log_lines = self.config.get("log_max_lines", 5000)
+
+        # Worker output is pulled at a fixed rate instead of pushed per message
+        self.ui_timer = QTimer(self)
+        self.ui_timer.setInterval(self.config.get("ui_refresh_ms", 100))
+        self.ui_timer.timeout.connect(self.drain_workers)
         
         self.init_ui()
         self.load_settings()
 
+        self.probe_worker = TesseractProbeWorker(self.config)
+        self.probe_worker.probe_finished.connect(self.on_tesseract_probed)
+        self.probe_worker.start()
+
     def init_ui(self):
         self.setWindowTitle(self.i18n.get("app_title"))
         self.resize(1000, 700)
@@ -59,6 +75,12 @@ class MainWindow(QMainWindow):
         self.ocr_lang_combo.currentTextChanged.connect(self.save_settings)
         ocr_layout.addWidget(QLabel(self.i18n.get("ocr_lang") + ":"))
         ocr_layout.addWidget(self.ocr_lang_combo)
+
+        self.ocr_profile_combo = QComboBox()
+        self.ocr_profile_combo.addItems(PREPROCESS_PROFILES)
+        self.ocr_profile_combo.currentTextChanged.connect(self.save_settings)
+        ocr_layout.addWidget(QLabel(self.i18n.get("ocr_profile") + ":"))
+        ocr_layout.addWidget(self.ocr_profile_combo)
         
         ocr_group.setLayout(ocr_layout)
         settings_layout.addWidget(ocr_group)
@@ -89,15 +111,26 @@ class MainWindow(QMainWindow):
         btn_layout.addWidget(self.btn_clear)
         btn_layout.addStretch()
         
-        self.file_list = QListWidget()
+        self.file_list = QTableView()
+        self.file_list.setModel(self.file_model)
+        self.file_list.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.file_list.setWordWrap(False)
+        self.file_list.verticalHeader().setVisible(False)
+        # Fixed row heights keep scrolling through 10k+ rows cheap
+        self.file_list.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        # Fixed column widths: ResizeToContents would measure every row
+        header = self.file_list.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.Stretch)
+        for column in range(1, self.file_model.columnCount()):
+            header.setSectionResizeMode(column, QHeaderView.Interactive)
+            header.resizeSection(column, 110)
         
         file_list_layout.addLayout(btn_layout)
         file_list_layout.addWidget(self.file_list)
         splitter.addWidget(file_list_widget)
 
         # Log Area
-        self.log_text = QTextEdit()
-        self.log_text.setReadOnly(True)
+        self.log_text = LogView(self.max_log_lines)
         splitter.addWidget(self.log_text)
         
         main_layout.addWidget(splitter)
@@ -115,6 +148,11 @@ class MainWindow(QMainWindow):
         
         bottom_layout.addStretch()
         
+        self.btn_watch = QPushButton(self.i18n.get("watch_folder"))
+        self.btn_watch.setMinimumHeight(40)
+        self.btn_watch.clicked.connect(self.toggle_watch)
+        bottom_layout.addWidget(self.btn_watch)
+
         self.btn_convert = QPushButton(self.i18n.get("convert"))
         self.btn_convert.setMinimumHeight(40)
         self.btn_convert.setMinimumWidth(150)
@@ -137,29 +175,55 @@ class MainWindow(QMainWindow):
         pass
 
     def load_settings(self):
+        self.output_folder = self.config.get("output_folder", "")
+
+        # Restoring a widget would fire save_settings and store the widgets
+        # not restored yet (e.g. the default profile over the saved one)
+        widgets = [self.lang_combo, self.ocr_check, self.ocr_lang_combo, self.ocr_profile_combo]
+        for widget in widgets:
+            widget.blockSignals(True)
+
         lang_map = {"pt_BR": 0, "en_US": 1, "es_ES": 2}
         self.lang_combo.setCurrentIndex(lang_map.get(self.config.get("language"), 0))
         
-        # Check if OCR is available before checking the box
-        ocr_enabled = self.config.get("ocr_enabled", False)
-        if ocr_enabled and not self.ocr_engine.is_available():
-            ocr_enabled = False
-            self.log("Warning: OCR disabled because Tesseract was not found.")
-            
-        self.ocr_check.setChecked(ocr_enabled)
+        # Tesseract availability is checked in the background (on_tesseract_probed)
+        self.ocr_check.setChecked(self.config.get("ocr_enabled", False))
         
         ocr_lang = self.config.get("ocr_language", "por")
         index = self.ocr_lang_combo.findText(ocr_lang)
         if index >= 0:
             self.ocr_lang_combo.setCurrentIndex(index)
+
+        ocr_profile = self.config.get("ocr_preprocess_profile", DEFAULT_PREPROCESS_PROFILE)
+        index = self.ocr_profile_combo.findText(ocr_profile)
+        if index >= 0:
+            self.ocr_profile_combo.setCurrentIndex(index)
+
+        for widget in widgets:
+            widget.blockSignals(False)
             
-        self.output_folder = self.config.get("output_folder", "")
         if self.output_folder:
             self.lbl_output.setText(self.output_folder)
 
+    def on_tesseract_probed(self, available):
+        self.ocr_available = available
+        if not available and self.ocr_check.isChecked():
+            # Keep the saved preference, just don't run OCR this session
+            self.ocr_check.blockSignals(True)
+            self.ocr_check.setChecked(False)
+            self.ocr_check.blockSignals(False)
+            self.log("Warning: OCR disabled because Tesseract was not found.")
+
+    def report_startup_time(self, start_time):
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+        self.log(f"Startup time: {elapsed_ms:.0f} ms")
+        return elapsed_ms
+
     def on_ocr_toggled(self, checked):
         if checked:
-            if not self.ocr_engine.is_available():
+            # While the probe is still running the check is allowed;
+            # on_tesseract_probed unchecks it if Tesseract is missing
+            if self.ocr_available is False:
                 from PySide6.QtWidgets import QMessageBox
                 QMessageBox.warning(
                     self, 
@@ -177,6 +241,7 @@ class MainWindow(QMainWindow):
         self.config.set("language", lang_codes[self.lang_combo.currentIndex()])
         self.config.set("ocr_enabled", self.ocr_check.isChecked())
         self.config.set("ocr_language", self.ocr_lang_combo.currentText())
+        self.config.set("ocr_preprocess_profile", self.ocr_profile_combo.currentText())
         self.config.set("output_folder", self.output_folder)
 
     def change_language(self):
@@ -189,8 +254,10 @@ class MainWindow(QMainWindow):
         self.drag_drop.update_text()
         self.btn_add.setText(self.i18n.get("select_files"))
         self.btn_clear.setText(self.i18n.get("clear_all"))
-        self.btn_convert.setText(self.i18n.get("convert"))
+        self.btn_convert.setText(self.i18n.get("stop_conversion" if self.worker else "convert"))
+        self.btn_watch.setText(self.i18n.get("stop_watching" if self.watch_worker else "watch_folder"))
         self.ocr_check.setText(self.i18n.get("enable_ocr"))
+        self.file_model.retranslate()
         # Update other labels...
 
     def select_files(self):
@@ -198,16 +265,31 @@ class MainWindow(QMainWindow):
         if files:
             self.add_files(files)
 
-    def add_files(self, files):
-        for f in files:
-            if f not in self.files_to_convert:
-                self.files_to_convert.append(f)
-                self.file_list.addItem(os.path.basename(f))
-        self.log(f"{len(files)} {self.i18n.get('files_selected')}")
+    def add_files(self, paths):
+        """Queues PDF paths; folders are searched recursively on a worker thread."""
+        folders = [p for p in paths if os.path.isdir(p)]
+        files = [p for p in paths if not os.path.isdir(p)]
+        if files:
+            added = self.file_model.add_paths(files)
+            self.log(f"{added} {self.i18n.get('files_selected')}")
+        if folders:
+            self.log(self.i18n.get("scanning_folders"))
+            scan_worker = FolderScanWorker(folders)
+            scan_worker.files_found.connect(self.file_model.add_paths)
+            scan_worker.finished_all.connect(self.scan_finished)
+            self.scan_workers.append(scan_worker)
+            scan_worker.start()
+
+    def scan_finished(self, found):
+        scan_worker = self.sender()
+        scan_worker.wait()
+        self.scan_workers.remove(scan_worker)
+        self.log(f"{found} {self.i18n.get('files_selected')}")
 
     def clear_files(self):
-        self.files_to_convert = []
-        self.file_list.clear()
+        for scan_worker in self.scan_workers:
+            scan_worker.stop()
+        self.file_model.clear()
 
     def select_output_folder(self):
         folder = QFileDialog.getExistingDirectory(self, self.i18n.get("select_folder"))
@@ -217,7 +299,14 @@ class MainWindow(QMainWindow):
             self.save_settings()
 
     def start_conversion(self):
-        if not self.files_to_convert:
+        if self.worker:
+            # Stops the file in flight too; conversion_finished restores the button
+            self.btn_convert.setEnabled(False)
+            self.worker.stop()
+            return
+
+        files = self.file_model.paths()
+        if not files:
             self.log(self.i18n.get("error") + ": No files selected")
             return
         
@@ -225,30 +314,103 @@ class MainWindow(QMainWindow):
             self.log(self.i18n.get("error") + ": No output folder selected")
             return
 
-        self.btn_convert.setEnabled(False)
+        self.btn_convert.setText(self.i18n.get("stop_conversion"))
         self.progress.setVisible(True)
         self.progress.setValue(0)
+        self.file_model.reset_status()
         
         self.worker = ConversionWorker(
-            self.files_to_convert, 
+            files,
             self.output_folder, 
             self.ocr_check.isChecked(), 
-            self.ocr_lang_combo.currentText()
+            self.ocr_lang_combo.currentText(),
+            self.max_log_lines
         )
-        self.worker.progress_updated.connect(self.update_progress)
-        self.worker.log_message.connect(self.log)
         self.worker.finished_all.connect(self.conversion_finished)
         self.worker.start()
+        self.ui_timer.start()
+
+    def toggle_watch(self):
+        if self.watch_worker:
+            self.btn_watch.setEnabled(False)
+            self.watch_worker.stop()
+            return
+
+        if not self.output_folder:
+            self.log(self.i18n.get("error") + ": No output folder selected")
+            return
+
+        folder = QFileDialog.getExistingDirectory(self, self.i18n.get("watch_folder"))
+        if not folder:
+            return
+
+        self.watch_worker = WatchWorker(
+            [folder],
+            self.output_folder,
+            self.ocr_check.isChecked(),
+            self.ocr_lang_combo.currentText(),
+            self.max_log_lines
+        )
+        self.watch_worker.finished_all.connect(self.watch_finished)
+        self.watch_worker.start()
+        self.ui_timer.start()
+        self.btn_watch.setText(self.i18n.get("stop_watching"))
+
+    def watch_finished(self):
+        self.drain_workers()
+        # finished_all is the thread's last act; wait so it is not destroyed while running
+        self.watch_worker.wait()
+        self.watch_worker = None
+        self.stop_timer_if_idle()
+        self.btn_watch.setEnabled(True)
+        self.btn_watch.setText(self.i18n.get("watch_folder"))
+
+    def drain_workers(self):
+        """Appends the workers' pending log lines and shows their latest progress."""
+        if self.worker:
+            lines, progress, statuses = self.worker.feed.drain()
+            self.log_text.append_lines(lines)
+            if progress:
+                self.update_progress(progress)
+            for path, (status, pages, duration) in statuses.items():
+                self.file_model.set_status(path, status, pages, duration)
+        if self.watch_worker:
+            lines, _, _ = self.watch_worker.feed.drain()
+            self.log_text.append_lines(lines)
 
-    def update_progress(self, current, total, filename):
-        percent = int((current / total) * 100)
-        self.progress.setValue(percent)
-        self.log(f"Processing: {filename}")
+    def stop_timer_if_idle(self):
+        if not self.worker and not self.watch_worker:
+            self.ui_timer.stop()
+
+    def update_progress(self, progress):
+        self.progress.setValue(progress["percent"])
+        self.progress.setFormat(self.i18n.get("progress_format").format(
+            progress["files_done"], progress["files_total"], progress["pages_done"]
+        ))
 
     def conversion_finished(self):
+        self.drain_workers()
+        self.worker.wait()
+        self.worker = None
+        self.stop_timer_if_idle()
         self.btn_convert.setEnabled(True)
+        self.btn_convert.setText(self.i18n.get("convert"))
         self.progress.setVisible(False)
         self.log(self.i18n.get("completed"))
 
+    def closeEvent(self, event):
+        # Don't destroy the probe thread while it is still running
+        self.probe_worker.wait()
+        for scan_worker in self.scan_workers:
+            scan_worker.stop()
+            scan_worker.wait()
+        if self.worker:
+            self.worker.stop()
+            self.worker.wait()
+        if self.watch_worker:
+            self.watch_worker.stop()
+            self.watch_worker.wait()
+        super().closeEvent(event)
+
     def log(self, message):
-        self.log_text.append(message)
+        self.log_text.append_lines([message])
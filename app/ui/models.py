@@ -0,0 +1,107 @@
+import os
+
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+STATUS_CANCELLED = "cancelled"
+
+class FileQueueModel(QAbstractTableModel):
+    """
+    The list of files to convert, for a QTableView. Rows live in a plain
+    list with a path -> row index, so duplicate checks are O(1) and a bulk
+    add is a single row insertion however many files it brings. The view
+    only asks for the rows on screen, so 10k+ files stay cheap.
+    """
+    COLUMNS = ["col_file", "col_status", "col_pages", "col_duration"]
+
+    def __init__(self, i18n):
+        super().__init__()
+        self.i18n = i18n
+        # Each row: [path, name, status, pages, duration]
+        self.rows = []
+        self.index_by_path = {}
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.i18n.get(self.COLUMNS[section])
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        path, name, status, pages, duration = self.rows[index.row()]
+        column = index.column()
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return name
+            if column == 1:
+                return self.i18n.get(f"status_{status}")
+            if column == 2:
+                return str(pages) if pages else ""
+            if column == 3:
+                return f"{duration:.1f} s" if duration is not None else ""
+        elif role == Qt.ToolTipRole and column == 0:
+            return path
+        elif role == Qt.TextAlignmentRole and column in (2, 3):
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def add_paths(self, paths):
+        """Appends the paths not already queued. Returns how many were added."""
+        new_paths = []
+        for path in paths:
+            if path not in self.index_by_path:
+                # Reserve the index now so duplicates within `paths` are skipped too
+                self.index_by_path[path] = len(self.rows) + len(new_paths)
+                new_paths.append(path)
+        if not new_paths:
+            return 0
+
+        first = len(self.rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(new_paths) - 1)
+        self.rows.extend([path, os.path.basename(path), STATUS_PENDING, None, None]
+                         for path in new_paths)
+        self.endInsertRows()
+        return len(new_paths)
+
+    def clear(self):
+        self.beginResetModel()
+        self.rows = []
+        self.index_by_path = {}
+        self.endResetModel()
+
+    def paths(self):
+        return [row[0] for row in self.rows]
+
+    def reset_status(self):
+        if not self.rows:
+            return
+        for row in self.rows:
+            row[2:] = [STATUS_PENDING, None, None]
+        self.dataChanged.emit(self.index(0, 1), self.index(len(self.rows) - 1, 3))
+
+    def set_status(self, path, status, pages=None, duration=None):
+        row_index = self.index_by_path.get(path)
+        if row_index is None:
+            return
+        row = self.rows[row_index]
+        row[2] = status
+        if pages is not None:
+            row[3] = pages
+        if duration is not None:
+            row[4] = duration
+        self.dataChanged.emit(self.index(row_index, 1), self.index(row_index, 3))
+
+    def retranslate(self):
+        self.headerDataChanged.emit(Qt.Horizontal, 0, len(self.COLUMNS) - 1)
+        if self.rows:
+            self.dataChanged.emit(self.index(0, 1), self.index(len(self.rows) - 1, 1))
@@ -1,4 +1,6 @@
-from PySide6.QtWidgets import QWidget, QLabel, QVBoxLayout, QFrame
+import os
+
+from PySide6.QtWidgets import QWidget, QLabel, QVBoxLayout, QFrame, QPlainTextEdit
 from PySide6.QtCore import Qt, Signal
 from PySide6.QtGui import QDragEnterEvent, QDropEvent
 
@@ -42,14 +44,31 @@ class DragDropWidget(QFrame):
             event.ignore()
 
     def dropEvent(self, event: QDropEvent):
-        files = []
+        # PDFs and folders; folders are scanned by the window off the UI thread
+        paths = []
         for url in event.mimeData().urls():
             path = url.toLocalFile()
-            if path.lower().endswith('.pdf'):
-                files.append(path)
+            if path.lower().endswith('.pdf') or os.path.isdir(path):
+                paths.append(path)
         
-        if files:
-            self.files_dropped.emit(files)
+        if paths:
+            self.files_dropped.emit(paths)
 
     def update_text(self):
         self.label.setText(self.i18n.get("drag_drop"))
+
+class LogView(QPlainTextEdit):
+    """
+    Read-only log that keeps at most `max_lines` lines; the oldest are
+    dropped as new ones arrive, so appending stays cheap on long batches.
+    """
+    def __init__(self, max_lines=5000):
+        super().__init__()
+        self.setReadOnly(True)
+        self.setUndoRedoEnabled(False)
+        self.setMaximumBlockCount(max_lines)
+
+    def append_lines(self, lines):
+        if lines:
+            # One insertion for the whole batch instead of one per line
+            self.appendPlainText("\n".join(lines))
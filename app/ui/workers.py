@@ -1,46 +1,425 @@
+import os
+import threading
+import time
+from collections import deque
+
 from PySide6.QtCore import QThread, Signal
-from app.core.converter import PDFConverter
+from app.core.cancel import CancelToken
+from app.core.config import ConfigManager
+
+# The conversion modules (pdf2docx, PyMuPDF, OpenCV, pytesseract) are
+# imported inside run() so they load on first use, not at startup.
+
+class WorkerFeed:
+    """
+    Thread-safe hand-off of log lines and progress from a worker thread to
+    the UI. Workers add to it as often as they like; the window drains it
+    on a timer ("ui_refresh_ms"), so the event loop gets one update per
+    refresh instead of one signal per page. At most `max_lines` pending
+    lines are kept, the same cap as the log view.
+    """
+    def __init__(self, max_lines=5000):
+        self.lock = threading.Lock()
+        self.lines = deque(maxlen=max_lines)
+        self.dropped = 0
+        self.files_total = 0
+        self.files_done = 0
+        self.current_file = ""
+        # file -> (pages done, total pages) for files still converting
+        self.pages = {}
+        self.finished = set()
+        self.pages_done = 0
+        self.changed = False
+        # file -> (status, pages, duration) not yet seen by the UI
+        self.statuses = {}
+
+    def log(self, message):
+        with self.lock:
+            if len(self.lines) == self.lines.maxlen:
+                self.dropped += 1
+            self.lines.append(message)
+
+    def start(self, files_total):
+        with self.lock:
+            self.files_total = files_total
+            self.changed = True
+
+    def file_started(self, file_path):
+        with self.lock:
+            self.current_file = file_path
+            self.statuses[file_path] = ("running", None, None)
+            self.changed = True
+
+    def page_progress(self, file_path, done, total):
+        with self.lock:
+            # Progress from worker processes can arrive after the result
+            if file_path in self.finished:
+                return
+            if file_path not in self.pages:
+                self.statuses[file_path] = ("running", total, None)
+            previous, _ = self.pages.get(file_path, (0, total))
+            self.pages[file_path] = (done, total)
+            self.pages_done += done - previous
+            self.current_file = file_path
+            self.changed = True
+
+    def file_finished(self, file_path, success=True, pages=None, duration=None, cancelled=False):
+        with self.lock:
+            status = "cancelled" if cancelled else "done" if success else "failed"
+            self.statuses[file_path] = (status, pages, duration)
+            self.pages.pop(file_path, None)
+            self.finished.add(file_path)
+            self.files_done += 1
+            self.changed = True
+
+    def drain(self):
+        """
+        Returns (lines, progress, statuses): the pending lines (with a
+        note if some were dropped), a progress dict (None if nothing
+        changed) and the per-file status changes since the last drain.
+        """
+        with self.lock:
+            lines = list(self.lines)
+            self.lines.clear()
+            if self.dropped:
+                lines.insert(0, f"... {self.dropped} log lines skipped ...")
+                self.dropped = 0
+
+            progress = None
+            if self.changed:
+                # Files in flight count by the share of their pages already
+                # done, up to 90%: the Word conversion still follows
+                partial = 0.9 * sum(done / total for done, total in self.pages.values() if total)
+                fraction = (self.files_done + partial) / self.files_total if self.files_total else 0.0
+                progress = {
+                    "percent": min(100, int(fraction * 100)),
+                    "files_done": self.files_done,
+                    "files_total": self.files_total,
+                    "pages_done": self.pages_done,
+                    "current_file": self.current_file,
+                }
+                self.changed = False
+            statuses = self.statuses
+            self.statuses = {}
+        return lines, progress, statuses
+
+class TesseractProbeWorker(QThread):
+    """Checks for Tesseract in the background so the window shows first."""
+    probe_finished = Signal(bool)
+
+    def __init__(self, config):
+        super().__init__()
+        self.config = config
+
+    def run(self):
+        from app.core.ocr import OCREngine
+        self.probe_finished.emit(OCREngine(self.config).is_available())
+
+class FolderScanWorker(QThread):
+    """
+    Finds the PDFs under dropped folders (recursively) off the UI thread
+    and reports them in chunks, so the queue fills while the scan runs.
+    """
+    files_found = Signal(list)
+    finished_all = Signal(int) # PDFs found
+
+    def __init__(self, folders, chunk_size=1000):
+        super().__init__()
+        self.folders = folders
+        self.chunk_size = chunk_size
+        self.is_running = True
+
+    def run(self):
+        found = 0
+        chunk = []
+        for root, files in self._walk():
+            for name in sorted(files):
+                if name.lower().endswith('.pdf'):
+                    chunk.append(os.path.join(root, name))
+            if len(chunk) >= self.chunk_size:
+                found += len(chunk)
+                self.files_found.emit(chunk)
+                chunk = []
+        # After stop() (the queue was cleared) the rest is dropped
+        if chunk and self.is_running:
+            found += len(chunk)
+            self.files_found.emit(chunk)
+        self.finished_all.emit(found)
+
+    def _walk(self):
+        """Yields (directory, file names) under every folder until stop() is called."""
+        for folder in self.folders:
+            for root, dirs, files in os.walk(folder):
+                if not self.is_running:
+                    return
+                dirs.sort()
+                yield root, files
+
+    def stop(self):
+        self.is_running = False
 
 class ConversionWorker(QThread):
-    progress_updated = Signal(int, int, str) # current, total, filename
-    log_message = Signal(str)
+    """
+    Converts the files on a background thread. Log lines and progress go
+    through `feed` (drained by the window); only completion is a signal.
+    stop() cancels the file in flight too, killing its OCR processes.
+    """
     finished_all = Signal()
-    
-    def __init__(self, file_paths, output_folder, use_ocr, lang):
+
+    def __init__(self, file_paths, output_folder, use_ocr, lang, max_log_lines=5000):
         super().__init__()
         self.file_paths = file_paths
         self.output_folder = output_folder
         self.use_ocr = use_ocr
         self.lang = lang
         self.is_running = True
+        self.cancel_token = CancelToken()
+        self.results = []
+        self.metrics = None
+        self.stats = None
+        self.feed = WorkerFeed(max_log_lines)
 
     def run(self):
-        converter = PDFConverter(logger_callback=self.emit_log)
+        from app.core.batch import BatchConverter
+        from app.core.metrics import create_recorder, StageStats
+        config = ConfigManager()
+        batch = BatchConverter(config)
+        self.metrics = create_recorder(config, log=self.emit_log)
+        self.stats = StageStats()
+        self.metrics.add_sink(self.stats)
+        self.feed.start(len(self.file_paths))
+        service_url = config.get("service_url", "")
+        try:
+            if service_url:
+                from app.core.service_client import ServiceClient
+                self.run_remote(ServiceClient(service_url, config.get("service_token", "")))
+            elif batch.get_workers(len(self.file_paths)) > 1:
+                self.run_concurrent(batch)
+            else:
+                self.run_sequential()
+            self.emit_summary()
+        finally:
+            self.metrics.close()
+        self.finished_all.emit()
+
+    def emit_summary(self):
+        """Logs p50/p95 per stage and pages/sec for the batch."""
+        lines = self.stats.format_summary()
+        if lines:
+            self.emit_log("Stage timings:")
+            for line in lines:
+                self.emit_log(line)
+
+    def run_sequential(self):
+        from app.core.converter import PDFConverter
+        converter = PDFConverter(logger_callback=self.emit_log, metrics=self.metrics,
+                                 cancel_token=self.cancel_token)
         total = len(self.file_paths)
-        
+
         for i, file_path in enumerate(self.file_paths):
             if not self.is_running:
                 break
-                
-            self.progress_updated.emit(i + 1, total, file_path)
+
+            self.feed.file_started(file_path)
             self.emit_log(f"Processing {i+1}/{total}: {file_path}")
-            
+            converter.progress_callback = (
+                lambda done, pages, path=file_path: self.feed.page_progress(path, done, pages)
+            )
+
+            start = time.perf_counter()
             success, msg = converter.convert(
-                file_path, 
-                self.output_folder, 
-                self.use_ocr, 
+                file_path,
+                self.output_folder,
+                self.use_ocr,
                 self.lang
             )
-            
+            duration = time.perf_counter() - start
+            cancelled = converter.document["outcome"] == "cancelled"
+            self.results.append({"file": file_path, "success": success, "message": msg,
+                                 "duration": duration, "cancelled": cancelled})
+            self.feed.file_finished(file_path, success, converter.document["pages"], duration,
+                                    cancelled)
+
+            if cancelled:
+                break
             if success:
                 self.emit_log(f"Successfully converted: {file_path}")
             else:
                 self.emit_log(f"Failed to convert {file_path}: {msg}")
-                
-        self.finished_all.emit()
+
+    def run_concurrent(self, batch):
+        total = len(self.file_paths)
+        self.emit_log(f"Converting {total} files, {batch.get_workers(total)} at a time")
+        self.results = batch.run(
+            self.file_paths,
+            self.output_folder,
+            self.use_ocr,
+            self.lang,
+            on_result=self.on_result,
+            should_continue=lambda: self.is_running,
+            on_progress=self.feed.page_progress,
+            cancel_token=self.cancel_token
+        )
+        self.emit_batch_summary()
+
+    def emit_batch_summary(self):
+        cancelled = sum(1 for r in self.results if r.get("cancelled"))
+        failed = sum(1 for r in self.results if not r["success"]) - cancelled
+        summary = f"Batch finished: {len(self.results) - failed - cancelled} succeeded, {failed} failed"
+        if cancelled:
+            summary += f", {cancelled} cancelled"
+        self.emit_log(summary)
+
+    def run_remote(self, client, poll_seconds=0.5):
+        """
+        Converts the files on the conversion service at "service_url"
+        (see app/core/service.py): uploads them all, follows the jobs and
+        downloads each .docx into the output folder as it is ready.
+        """
+        from app.core.service_client import ServiceError
+        total = len(self.file_paths)
+        self.emit_log(f"Sending {total} files to the conversion service at {client.url}")
+        # job id -> file path, for the jobs still on the service
+        jobs = {}
+        started = set()
+        for file_path in self.file_paths:
+            if not self.is_running:
+                break
+            try:
+                job = client.submit(file_path, self.use_ocr, self.lang)
+            except (ServiceError, OSError) as e:
+                self.on_result(0, total, self.remote_result(file_path, None, str(e)))
+                continue
+            jobs[job["id"]] = file_path
+
+        while jobs and not self.cancel_token.wait(poll_seconds):
+            try:
+                states = {job["id"]: job for job in client.jobs() if job["id"] in jobs}
+            except ServiceError as e:
+                self.emit_log(f"Conversion service error: {e}")
+                continue
+            for job_id, file_path in list(jobs.items()):
+                job = states.get(job_id)
+                if job is None:
+                    # Expired or removed on the service
+                    del jobs[job_id]
+                    self.on_result(0, total, self.remote_result(file_path, None, "Job was removed"))
+                elif job["status"] == "running":
+                    if job_id not in started:
+                        started.add(job_id)
+                        self.feed.file_started(file_path)
+                    if job["pages_total"]:
+                        self.feed.page_progress(file_path, job["pages_done"], job["pages_total"])
+                elif job["status"] != "queued":
+                    del jobs[job_id]
+                    self.on_result(0, total, self.finish_remote(client, file_path, job))
+
+        # Stopped: drop the jobs still queued or running on the service
+        for job_id, file_path in jobs.items():
+            try:
+                job = client.delete(job_id)
+            except ServiceError:
+                job = None
+            result = self.remote_result(file_path, job, "Cancelled")
+            result["cancelled"] = True
+            self.on_result(0, total, result)
+
+        self.emit_batch_summary()
+
+    def finish_remote(self, client, file_path, job):
+        """Fetches a finished job's log and .docx, then removes it from the service."""
+        from app.core.service_client import ServiceError
+        try:
+            job = client.status(job["id"])
+            if job["status"] == "done":
+                name = os.path.splitext(os.path.basename(file_path))[0]
+                output_path = client.download(job["id"], os.path.join(self.output_folder, f"{name}.docx"))
+                result = self.remote_result(file_path, job, output_path, success=True)
+            else:
+                result = self.remote_result(file_path, job, job["message"])
+                result["cancelled"] = job["status"] == "cancelled"
+            client.delete(job["id"])
+        except (ServiceError, OSError) as e:
+            result = self.remote_result(file_path, job, str(e))
+        return result
+
+    def remote_result(self, file_path, job, message, success=False):
+        """A result like the batch executor's, for a job run on the service."""
+        result = {"file": file_path, "success": success, "message": message,
+                  "duration": 0.0, "log": [], "events": []}
+        if job:
+            result["log"] = job["log"]
+            result["pages"] = job["pages_total"] or None
+            if job["started"] and job["finished"]:
+                result["duration"] = job["finished"] - job["started"]
+        self.results.append(result)
+        return result
+
+    def on_result(self, done, total, result):
+        file_path = result["file"]
+        cancelled = result.get("cancelled", False)
+        self.feed.file_finished(file_path, result["success"], result.get("pages"), result["duration"],
+                                cancelled)
+        # Replay the document's log as one block so files don't interleave
+        for message in result["log"]:
+            self.emit_log(message)
+        for event in result["events"]:
+            self.metrics.replay(event)
+        if cancelled:
+            self.emit_log(f"Cancelled: {file_path}")
+        elif result["success"]:
+            self.emit_log(f"Successfully converted: {file_path}")
+        else:
+            self.emit_log(f"Failed to convert {file_path}: {result['message']}")
 
     def emit_log(self, message):
-        self.log_message.emit(message)
+        self.feed.log(message)
 
     def stop(self):
         self.is_running = False
+        self.cancel_token.cancel()
+
+class WatchWorker(QThread):
+    """Runs the hot-folder WatchService until stop() is called."""
+    finished_all = Signal()
+
+    def __init__(self, folders, output_folder, use_ocr, lang, max_log_lines=5000):
+        super().__init__()
+        self.folders = folders
+        self.output_folder = output_folder
+        self.use_ocr = use_ocr
+        self.lang = lang
+        # Created here so a stop() before run() has built the service is kept
+        self.stop_event = threading.Event()
+        self.feed = WorkerFeed(max_log_lines)
+
+    def run(self):
+        from app.core.watch import WatchService
+        from app.core.metrics import create_recorder
+        config = ConfigManager()
+        metrics = create_recorder(config, log=self.feed.log)
+        service = WatchService(
+            config,
+            self.folders,
+            self.output_folder,
+            self.use_ocr,
+            self.lang,
+            logger_callback=self.feed.log,
+            result_callback=self.on_result,
+            metrics=metrics,
+            stop_event=self.stop_event
+        )
+        try:
+            service.run()
+        finally:
+            metrics.close()
+        self.finished_all.emit()
+
+    def on_result(self, result):
+        if result["success"]:
+            self.feed.log(f"Successfully converted: {result['file']}")
+        else:
+            self.feed.log(f"Failed to convert {result['file']}: {result['message']}")
+
+    def stop(self):
+        self.stop_event.set()
@@ -5,6 +5,7 @@ class I18n:
             "select_files": "Selecionar Arquivos",
             "select_folder": "Selecionar Pasta de Saída",
             "convert": "Converter",
+            "stop_conversion": "Parar",
             "converting": "Convertendo...",
             "success": "Sucesso",
             "error": "Erro",
@@ -14,19 +15,34 @@ class I18n:
             "ocr_settings": "Configurações de OCR",
             "enable_ocr": "Habilitar OCR (Lento)",
             "ocr_lang": "Idioma do OCR",
+            "ocr_profile": "Pré-processamento",
             "files_selected": "arquivos selecionados",
             "drag_drop": "Arraste e solte arquivos PDF aqui",
             "status_ready": "Pronto",
             "status_processing": "Processando {} de {}",
             "open_output": "Abrir Pasta",
             "remove": "Remover",
-            "clear_all": "Limpar Tudo"
+            "clear_all": "Limpar Tudo",
+            "watch_folder": "Monitorar Pasta",
+            "stop_watching": "Parar Monitoramento",
+            "progress_format": "%p% - {} de {} arquivos, {} páginas",
+            "col_file": "Arquivo",
+            "col_status": "Status",
+            "col_pages": "Páginas",
+            "col_duration": "Duração",
+            "status_pending": "Pendente",
+            "status_running": "Convertendo",
+            "status_done": "Concluído",
+            "status_failed": "Falhou",
+            "status_cancelled": "Cancelado",
+            "scanning_folders": "Procurando PDFs nas pastas..."
         },
         "en_US": {
             "app_title": "PDF to Word Converter",
             "select_files": "Select Files",
             "select_folder": "Select Output Folder",
             "convert": "Convert",
+            "stop_conversion": "Stop",
             "converting": "Converting...",
             "success": "Success",
             "error": "Error",
@@ -36,19 +52,34 @@ class I18n:
             "ocr_settings": "OCR Settings",
             "enable_ocr": "Enable OCR (Slow)",
             "ocr_lang": "OCR Language",
+            "ocr_profile": "Preprocessing",
             "files_selected": "files selected",
             "drag_drop": "Drag and drop PDF files here",
             "status_ready": "Ready",
             "status_processing": "Processing {} of {}",
             "open_output": "Open Folder",
             "remove": "Remove",
-            "clear_all": "Clear All"
+            "clear_all": "Clear All",
+            "watch_folder": "Watch Folder",
+            "stop_watching": "Stop Watching",
+            "progress_format": "%p% - {} of {} files, {} pages",
+            "col_file": "File",
+            "col_status": "Status",
+            "col_pages": "Pages",
+            "col_duration": "Duration",
+            "status_pending": "Pending",
+            "status_running": "Converting",
+            "status_done": "Done",
+            "status_failed": "Failed",
+            "status_cancelled": "Cancelled",
+            "scanning_folders": "Searching folders for PDFs..."
         },
         "es_ES": {
             "app_title": "Conversor PDF a Word",
             "select_files": "Seleccionar Archivos",
             "select_folder": "Seleccionar Carpeta de Salida",
             "convert": "Convertir",
+            "stop_conversion": "Detener",
             "converting": "Convirtiendo...",
             "success": "Éxito",
             "error": "Error",
@@ -58,13 +89,27 @@ class I18n:
             "ocr_settings": "Configuración de OCR",
             "enable_ocr": "Habilitar OCR (Lento)",
             "ocr_lang": "Idioma del OCR",
+            "ocr_profile": "Preprocesamiento",
             "files_selected": "archivos seleccionados",
             "drag_drop": "Arrastre y suelte archivos PDF aquí",
             "status_ready": "Listo",
             "status_processing": "Procesando {} de {}",
             "open_output": "Abrir Carpeta",
             "remove": "Eliminar",
-            "clear_all": "Limpiar Todo"
+            "clear_all": "Limpiar Todo",
+            "watch_folder": "Monitorear Carpeta",
+            "stop_watching": "Detener Monitoreo",
+            "progress_format": "%p% - {} de {} archivos, {} páginas",
+            "col_file": "Archivo",
+            "col_status": "Estado",
+            "col_pages": "Páginas",
+            "col_duration": "Duración",
+            "status_pending": "Pendiente",
+            "status_running": "Convirtiendo",
+            "status_done": "Completado",
+            "status_failed": "Falló",
+            "status_cancelled": "Cancelado",
+            "scanning_folders": "Buscando PDFs en las carpetas..."
         }
     }
 
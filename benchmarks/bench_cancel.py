@@ -0,0 +1,110 @@
+"""
+Measures how long a conversion takes to stop once it is cancelled: the
+time from CancelToken.cancel() to convert() returning, with the
+cancellation fired at several points of the run. Also checks that no
+temporary files or partial .docx are left behind. With Tesseract the
+document is a scanned one (OCR subprocesses and workers are killed);
+without it, a text document (the pdf2docx stage is stopped).
+
+    python -m benchmarks.bench_cancel [--pages 40] [--delays 0.5 1 2 4] [--lang eng]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.synthetic import make_pdf
+
+def cancel_once(pdf_path, output_folder, use_ocr, lang, delay):
+    """Converts the document, cancelling it after `delay` seconds."""
+    import logging
+    logging.disable(logging.WARNING)
+    from app.core.cancel import CancelToken
+    from app.core.converter import PDFConverter
+
+    # Everything the run writes to the temp dir ends up in here
+    temp_dir = tempfile.mkdtemp(prefix="tmp_", dir=output_folder)
+    tempfile.tempdir = temp_dir
+
+    token = CancelToken()
+    converter = PDFConverter(logger_callback=lambda message: None, cancel_token=token)
+    converter.config.config["ocr_journal_enabled"] = False
+    converter.result_cache = None
+    converter.page_cache = None
+
+    cancelled_at = {}
+    def cancel():
+        time.sleep(delay)
+        cancelled_at["t"] = time.perf_counter()
+        token.cancel()
+    timer = threading.Thread(target=cancel, daemon=True)
+    timer.start()
+
+    success, _ = converter.convert(pdf_path, output_folder, use_ocr, lang)
+    returned = time.perf_counter()
+    timer.join()
+    # Killed processes may still be exiting; give them a moment to let go
+    time.sleep(0.2)
+    return {
+        "finished": success,
+        "latency_s": returned - cancelled_at["t"] if not success else None,
+        "temp_left": len(os.listdir(temp_dir)),
+        "docx_left": any(name.endswith(".docx") for name in os.listdir(output_folder)),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--delays", type=float, nargs="+", default=[0.5, 1.0, 2.0, 4.0],
+                        help="Seconds into the run at which to cancel")
+    parser.add_argument("--lang", default="eng", help="OCR language")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    from app.core.config import ConfigManager
+    from app.core.ocr import OCREngine
+    use_ocr = OCREngine(ConfigManager()).is_available()
+    kind = "scanned" if use_ocr else "text"
+    if not use_ocr:
+        print("Tesseract not found: cancelling the pdf2docx stage of a text document")
+
+    results = {"kind": kind, "pages": args.pages, "runs": []}
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, f"{kind}.pdf")
+        make_pdf(pdf_path, kind, args.pages)
+        for n, delay in enumerate(args.delays):
+            output_folder = tempfile.mkdtemp(prefix=f"run{n}_", dir=tmp)
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                run = executor.submit(cancel_once, pdf_path, output_folder,
+                                      use_ocr, args.lang, delay).result()
+            run["delay_s"] = delay
+            results["runs"].append(run)
+
+    for run in results["runs"]:
+        if run["finished"]:
+            stopped = "finished before the cancel"
+        else:
+            stopped = f"stopped in {run['latency_s'] * 1000:7.1f} ms"
+        print(f"cancel at {run['delay_s']:>5.1f} s: {stopped}  "
+              f"temp files left: {run['temp_left']}  partial .docx: {'yes' if run['docx_left'] else 'no'}")
+    latencies = [run["latency_s"] for run in results["runs"] if not run["finished"]]
+    if latencies:
+        results["max_latency_s"] = max(latencies)
+        print(f"Stop latency: median {statistics.median(latencies) * 1000:.1f} ms, "
+              f"max {max(latencies) * 1000:.1f} ms")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4)
+    leftovers = any(run["temp_left"] or run["docx_left"] for run in results["runs"])
+    return 1 if leftovers else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""
+Compares serial pdf2docx conversion with the multi-process mode used for
+long documents (see PDFConverter._convert_to_docx).
+
+    python -m benchmarks.bench_docx_sharding [--pages 120] [--workers 4]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import fitz  # PyMuPDF
+
+from app.core.converter import PDFConverter
+
+def make_text_report(path, pages):
+    """Writes a text-heavy report: paragraphs and a small table per page."""
+    doc = fitz.open()
+    paragraph = ("Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do "
+                 "eiusmod tempor incididunt ut labore et dolore magna aliqua. ")
+    for i in range(pages):
+        page = doc.new_page(width=595, height=842)
+        page.insert_text((50, 50), f"Section {i + 1}", fontsize=16)
+        rect = fitz.Rect(50, 70, 545, 600)
+        page.insert_textbox(rect, paragraph * 12, fontsize=10)
+        for row in range(5):
+            for col in range(4):
+                cell = fitz.Rect(50 + col * 120, 620 + row * 30, 170 + col * 120, 650 + row * 30)
+                page.draw_rect(cell)
+                page.insert_textbox(cell + (4, 4, -4, -4), f"R{row} C{col}", fontsize=9)
+    doc.save(path)
+    doc.close()
+
+def time_conversion(converter, source, output_path, scratch_dir):
+    start = time.perf_counter()
+    converter._convert_to_docx(source, output_path, scratch_dir)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=120)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "report.pdf")
+        make_text_report(source, args.pages)
+
+        converter = PDFConverter(logger_callback=lambda m: None)
+        converter.docx_workers = 1
+        serial = time_conversion(converter, source, os.path.join(tmp, "serial.docx"), tmp)
+
+        converter.docx_workers = args.workers
+        converter.config.config["docx_shard_min_pages"] = 1
+        sharded = time_conversion(converter, source, os.path.join(tmp, "sharded.docx"), tmp)
+
+    results = {
+        "pages": args.pages,
+        "workers": args.workers,
+        "serial_s": round(serial, 2),
+        "multiprocess_s": round(sharded, 2),
+        "speedup": round(serial / sharded, 2) if sharded else None,
+    }
+    print(f"{args.pages} pages: serial {serial:.2f} s, "
+          f"{args.workers} processes {sharded:.2f} s ({results['speedup']}x)")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4)
+
+if __name__ == "__main__":
+    main()
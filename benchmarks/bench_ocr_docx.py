@@ -0,0 +1,100 @@
+"""
+Compares the two ways of producing a .docx from a scanned document:
+OCR to a searchable PDF followed by pdf2docx, and the direct path that
+builds the Word document from the OCR layout (see app/core/ocr_docx.py).
+Each run happens in a fresh process; caches and the OCR journal are off.
+
+    python -m benchmarks.bench_ocr_docx [--pages 10] [--runs 3] [--lang eng]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.bench_pipeline import peak_rss_mb
+from benchmarks.synthetic import make_pdf
+
+ENGINES = ["pdf2docx", "ocr_layout"]
+
+def convert_once(pdf_path, output_folder, engine, lang):
+    """Converts the document with the given "docx_engine" setting."""
+    import logging
+    logging.disable(logging.WARNING)
+    from docx import Document
+    from app.core.converter import PDFConverter
+
+    log = []
+    converter = PDFConverter(logger_callback=log.append)
+    converter.config.config["docx_engine"] = engine
+    converter.config.config["ocr_journal_enabled"] = False
+    converter.result_cache = None
+    converter.page_cache = None
+
+    start = time.perf_counter()
+    success, output = converter.convert(pdf_path, output_folder, True, lang)
+    duration = time.perf_counter() - start
+    if not success:
+        raise RuntimeError(output)
+    text = "\n".join(p.text for p in Document(output).paragraphs)
+    return {
+        "duration_s": duration,
+        "peak_rss_mb": peak_rss_mb(),
+        "direct": any("built from the OCR layout" in line for line in log),
+        "words": len(text.split()),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--runs", type=int, default=3, help="Runs per engine (the median is kept)")
+    parser.add_argument("--lang", default="eng", help="OCR language")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    from app.core.config import ConfigManager
+    from app.core.ocr import OCREngine
+    if not OCREngine(ConfigManager()).is_available():
+        print("Tesseract not found: both paths need OCR")
+        return 1
+
+    results = {"pages": args.pages, "engines": {}}
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "scanned.pdf")
+        make_pdf(pdf_path, "scanned", args.pages)
+        for engine in ENGINES:
+            samples = []
+            for run in range(args.runs):
+                output_folder = tempfile.mkdtemp(prefix=f"{engine}{run}_", dir=tmp)
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                    samples.append(executor.submit(convert_once, pdf_path, output_folder,
+                                                   engine, args.lang).result())
+            duration = statistics.median(s["duration_s"] for s in samples)
+            results["engines"][engine] = {
+                "direct": samples[0]["direct"],
+                "duration_s": round(duration, 3),
+                "pages_per_s": round(args.pages / duration, 3),
+                "peak_rss_mb": max(s["peak_rss_mb"] or 0 for s in samples),
+                "words": samples[0]["words"],
+            }
+
+    for engine, r in results["engines"].items():
+        label = "direct" if r["direct"] else "pdf2docx"
+        print(f"{label:<10} {r['duration_s']:>8.2f} s  {r['pages_per_s']:>6.2f} pages/s  "
+              f"{r['peak_rss_mb']:>6.0f} MB  {r['words']} words")
+    pdf2docx, direct = results["engines"]["pdf2docx"], results["engines"]["ocr_layout"]
+    if direct["duration_s"]:
+        print(f"Direct path speedup: {pdf2docx['duration_s'] / direct['duration_s']:.2f}x")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
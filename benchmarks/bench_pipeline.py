@@ -0,0 +1,272 @@
+"""
+Benchmark suite for the conversion pipeline. Generates synthetic PDFs
+(see benchmarks/synthetic.py), converts them with PDFConverter.convert
+and records the wall time, pages/sec, peak RSS and the time spent in
+each stage (from the converter's metrics events). Each run happens in a
+fresh process with empty caches, so peak RSS is per scenario.
+
+    python -m benchmarks.bench_pipeline --json results.json
+    python -m benchmarks.bench_pipeline --save-baseline baseline.json
+    python -m benchmarks.bench_pipeline --baseline baseline.json --threshold 0.15
+    python -m benchmarks.bench_pipeline --set docx_engine=ocr_layout --set ocr_workers=1
+
+With --baseline the exit code is 1 when the wall time or any stage got
+slower (or peak RSS grew) by more than the threshold.
+
+Stage times are summed over pages, and pages are OCR'd in parallel, so
+they add up to more than the wall time on several cores.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import fitz  # PyMuPDF
+
+from benchmarks.synthetic import PAGE_KINDS, make_pdf
+
+# Stages shown in the table; every stage the converter reports is kept in the results
+STAGES = ["classify", "screen", "render", "preprocess", "ocr", "merge", "docx", "pdf2docx"]
+
+# Differences below these are noise, whatever the threshold says
+MIN_DELTA_S = 0.05
+MIN_DELTA_MB = 10.0
+
+def peak_rss_mb(children=False):
+    """
+    Peak resident set size of this process in MB (None if unknown). With
+    `children`, the largest of it and its finished child processes (OCR
+    and pdf2docx workers; not available on Windows).
+    """
+    try:
+        import resource
+    except ImportError:
+        return _peak_rss_windows_mb()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if children:
+        peak = max(peak, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    if sys.platform == "darwin":
+        peak /= 1024 # macOS reports bytes, Linux reports KB
+    return round(peak / 1024, 1)
+
+def _peak_rss_windows_mb():
+    try:
+        import ctypes
+        from ctypes import wintypes
+    except ImportError:
+        return None
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [("cb", wintypes.DWORD),
+                    ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t),
+                    ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t),
+                    ("PeakPagefileUsage", ctypes.c_size_t)]
+    try:
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return None
+        return round(counters.PeakWorkingSetSize / (1024 * 1024), 1)
+    except (AttributeError, OSError):
+        return None
+
+def run_convert(pdf_path, lang, work_dir, settings):
+    """
+    Converts one document with PDFConverter.convert, as the app does, and
+    returns the time spent in each stage from its metrics events. Runs in
+    a fresh worker process (see run_scenario) with default settings plus
+    `settings`, and caches and OCR journal in `work_dir`, so every run
+    starts cold.
+    """
+    # pdf2docx logs every step, and warns about scanned pages
+    logging.disable(logging.WARNING)
+
+    # ConfigManager (here and in the OCR worker processes) reads the
+    # settings and keeps the caches under the user's home
+    home = os.path.join(work_dir, "home")
+    os.makedirs(home)
+    for name in ("HOME", "USERPROFILE", "APPDATA"):
+        os.environ[name] = home
+
+    from app.core.config import ConfigManager
+    config = ConfigManager()
+    config.config.update(settings)
+    config.save_config()
+
+    from app.core.converter import PDFConverter
+    from app.core.metrics import MetricsRecorder, StageStats
+    stats = StageStats()
+    converter = PDFConverter(logger_callback=lambda message: None,
+                             metrics=MetricsRecorder([stats]))
+    tesseract = converter.ocr_engine.is_available()
+    output_folder = os.path.join(work_dir, "output")
+    os.makedirs(output_folder)
+
+    start = time.perf_counter()
+    success, message = converter.convert(pdf_path, output_folder, True, lang)
+    wall = time.perf_counter() - start
+    if not success:
+        raise RuntimeError(message)
+
+    summary = stats.summary()
+    return {
+        "ocr_pages": converter.document["ocr_pages"],
+        "tesseract": tesseract,
+        "stages": {stage: values["total_s"] for stage, values in summary["stages"].items()},
+        "wall_s": wall,
+        "peak_rss_mb": peak_rss_mb(children=True),
+    }
+
+def run_scenario(kind, pages, runs, lang, tmp, settings):
+    """Generates the scenario's PDF and converts it `runs` times."""
+    pdf_path = os.path.join(tmp, f"{kind}-{pages}.pdf")
+    make_pdf(pdf_path, kind, pages)
+
+    samples = []
+    context = multiprocessing.get_context("spawn")
+    for run in range(runs):
+        work_dir = tempfile.mkdtemp(prefix=f"run{run}_", dir=tmp)
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            samples.append(executor.submit(run_convert, pdf_path, lang, work_dir, settings).result())
+
+    names = sorted(set(STAGES).union(*(s["stages"] for s in samples)))
+    stages = {stage: round(statistics.median(s["stages"].get(stage, 0.0) for s in samples), 4)
+              for stage in names}
+    total = statistics.median(s["wall_s"] for s in samples)
+    rss = [s["peak_rss_mb"] for s in samples if s["peak_rss_mb"] is not None]
+    return {
+        "kind": kind,
+        "pages": pages,
+        "ocr_pages": samples[0]["ocr_pages"],
+        "tesseract": samples[0]["tesseract"],
+        "runs": runs,
+        "stages_s": stages,
+        "total_s": round(total, 4),
+        "pages_per_s": round(pages / total, 3) if total else None,
+        "peak_rss_mb": max(rss) if rss else None,
+        "file_mb": round(os.path.getsize(pdf_path) / (1024 * 1024), 2),
+    }
+
+def environment():
+    from app import __version__
+    return {
+        "app_version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "pymupdf": fitz.VersionBind,
+    }
+
+def compare(results, baseline, threshold):
+    """
+    Compares results with a baseline. Returns a list of regression
+    messages (empty when nothing regressed beyond `threshold`).
+    """
+    regressions = []
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if previous is None:
+            print(f"{name}: not in baseline")
+            continue
+        if previous.get("tesseract") != current.get("tesseract"):
+            print(f"{name}: Tesseract availability differs from the baseline, OCR timings are not comparable")
+
+        metrics = [("total", previous["total_s"], current["total_s"], MIN_DELTA_S, "s")]
+        metrics += [(stage, previous["stages_s"].get(stage, 0.0), seconds, MIN_DELTA_S, "s")
+                    for stage, seconds in current["stages_s"].items()]
+        if previous.get("peak_rss_mb") and current.get("peak_rss_mb"):
+            metrics.append(("peak_rss", previous["peak_rss_mb"], current["peak_rss_mb"], MIN_DELTA_MB, "MB"))
+
+        for metric, old, new, min_delta, unit in metrics:
+            if new - old > min_delta and new > old * (1 + threshold):
+                change = f"+{(new / old - 1) * 100:.0f}%" if old else "new"
+                regressions.append(f"{name} {metric}: {old:.3f} -> {new:.3f} {unit} ({change})")
+    return regressions
+
+def print_results(results):
+    header = f"{'scenario':<14}" + "".join(f"{stage:>11}" for stage in STAGES) + f"{'wall':>9}{'pages/s':>9}{'RSS MB':>8}"
+    print(header)
+    for name, r in results["scenarios"].items():
+        row = f"{name:<14}" + "".join(f"{r['stages_s'][stage]:>11.3f}" for stage in STAGES)
+        row += f"{r['total_s']:>9.2f}{r['pages_per_s'] or 0:>9.2f}{r['peak_rss_mb'] or 0:>8.0f}"
+        print(row)
+
+def parse_list(value, cast=str):
+    return [cast(item) for item in value.split(",") if item.strip()]
+
+def parse_settings(items):
+    """KEY=VALUE settings, with JSON values (numbers, true/false) where they parse."""
+    settings = {}
+    for item in items:
+        key, _, value = item.partition("=")
+        try:
+            settings[key.strip()] = json.loads(value)
+        except ValueError:
+            settings[key.strip()] = value
+    return settings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--kinds", default=",".join(PAGE_KINDS),
+                        help=f"Comma separated page kinds ({', '.join(PAGE_KINDS)})")
+    parser.add_argument("--pages", default="5,20", help="Comma separated page counts")
+    parser.add_argument("--large-pages", default="2",
+                        help="Page counts for the 'large' and 'poster' kinds (their pages are slow)")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per scenario (the median is kept)")
+    parser.add_argument("--lang", default="eng", help="OCR language")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--save-baseline", help="Write results to this file as the new baseline")
+    parser.add_argument("--baseline", help="Compare with this baseline file")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="Allowed slowdown before a metric counts as a regression (0.15 = 15%%)")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help="Converter setting for every run (e.g. docx_engine=ocr_layout), repeatable")
+    args = parser.parse_args()
+    settings = parse_settings(args.set)
+
+    results = {"environment": environment(), "settings": settings, "scenarios": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        for kind in parse_list(args.kinds):
+            page_counts = args.large_pages if kind in ("large", "poster") else args.pages
+            for pages in parse_list(page_counts, int):
+                name = f"{kind}-{pages}p"
+                print(f"Running {name}...", flush=True)
+                results["scenarios"][name] = run_scenario(kind, pages, args.runs, args.lang, tmp, settings)
+
+    print_results(results)
+    if not all(r["tesseract"] for r in results["scenarios"].values()):
+        print("Tesseract not found: documents were converted without OCR")
+
+    for path in (args.json, args.save_baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=4)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regressions over {args.threshold:.0%}:")
+            for message in regressions:
+                print(f"  {message}")
+            return 1
+        print(f"No regressions over {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
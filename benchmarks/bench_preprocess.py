@@ -0,0 +1,63 @@
+"""
+Measures per-page time of each OCR preprocessing profile on a synthetic
+scanned page (text with noise and uneven lighting).
+
+    python -m benchmarks.bench_preprocess [--zoom 2.0] [--runs 5]
+"""
+import argparse
+import json
+import time
+
+import fitz  # PyMuPDF
+import numpy as np
+
+from app.core.config import ConfigManager
+from app.core.ocr import OCREngine, PREPROCESS_PROFILES
+
+def make_scanned_page(zoom):
+    """Renders an A4 text page and degrades it like a scan."""
+    doc = fitz.open()
+    page = doc.new_page(width=595, height=842)
+    text = "The quick brown fox jumps over the lazy dog. 0123456789 " * 4
+    for y in range(60, 800, 16):
+        page.insert_text((40, y), text[:95], fontsize=10)
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY)
+    gray = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width]
+    doc.close()
+
+    rng = np.random.default_rng(0)
+    lighting = np.linspace(0, 60, gray.shape[1], dtype=np.float32)
+    noisy = gray.astype(np.float32) - lighting + rng.normal(0, 12, gray.shape)
+    return np.clip(noisy, 0, 255).astype(np.uint8)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--zoom", type=float, default=2.0)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    engine = OCREngine(ConfigManager())
+    image = make_scanned_page(args.zoom)
+    print(f"Page: {image.shape[1]}x{image.shape[0]} px, {args.runs} runs per profile")
+
+    results = {}
+    for profile in PREPROCESS_PROFILES:
+        engine.preprocess_image(image, profile) # Warm up
+        timings = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            engine.preprocess_image(image, profile)
+            timings.append(time.perf_counter() - start)
+        results[profile] = {
+            "median_ms": round(float(np.median(timings)) * 1000, 2),
+            "min_ms": round(min(timings) * 1000, 2),
+        }
+        print(f"{profile:>10}: {results[profile]['median_ms']:9.2f} ms/page (median)")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({"zoom": args.zoom, "shape": list(image.shape), "profiles": results}, f, indent=4)
+
+if __name__ == "__main__":
+    main()
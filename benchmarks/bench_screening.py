@@ -0,0 +1,112 @@
+"""
+Measures the blank and near-duplicate page screening: its cost per page
+and what it finds on a synthetic batch of scanned pages (repeated cover
+sheets and blank separators). With Tesseract, the document is also
+converted with screening off and on to show the OCR time it saves.
+
+    python -m benchmarks.bench_screening [--pages 24] [--lang eng]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import fitz  # PyMuPDF
+
+from benchmarks.synthetic import make_pdf
+
+def screen_pages(pdf_path):
+    """Screens every page like the converter does. Returns kinds and timings."""
+    from app.core.config import ConfigManager
+    from app.core.screening import PageScreener
+
+    screener = PageScreener(ConfigManager())
+    kinds, seconds = [], []
+    doc = fitz.open(pdf_path)
+    try:
+        for i, page in enumerate(doc):
+            kind, _, signature, elapsed = screener.screen(page, "eng")
+            if kind == "unique":
+                done = Future()
+                done.set_result(None)
+                screener.remember(signature, i + 1, done, "layout")
+            kinds.append(kind)
+            seconds.append(elapsed)
+    finally:
+        doc.close()
+    return kinds, seconds
+
+def convert_once(pdf_path, output_folder, lang, screening):
+    """Converts the document with OCR, with screening on or off. Returns seconds."""
+    import logging
+    logging.disable(logging.WARNING)
+    from app.core.converter import PDFConverter
+    from app.core.screening import PageScreener
+
+    converter = PDFConverter(logger_callback=lambda message: None)
+    converter.config.config["ocr_journal_enabled"] = False
+    converter.config.config["ocr_skip_blank_pages"] = screening
+    converter.config.config["ocr_skip_duplicate_pages"] = screening
+    converter.result_cache = None
+    converter.page_cache = None
+    converter.screener = PageScreener(converter.config)
+
+    start = time.perf_counter()
+    success, message = converter.convert(pdf_path, output_folder, True, lang)
+    if not success:
+        raise RuntimeError(message)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=24)
+    parser.add_argument("--lang", default="eng", help="OCR language")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    from app.core.config import ConfigManager
+    from app.core.ocr import OCREngine
+    use_ocr = OCREngine(ConfigManager()).is_available()
+
+    results = {"pages": args.pages}
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "repeats.pdf")
+        make_pdf(pdf_path, "repeats", args.pages)
+
+        kinds, seconds = screen_pages(pdf_path)
+        results["screening"] = {
+            "unique": kinds.count("unique"),
+            "blank": kinds.count("blank"),
+            "duplicate": kinds.count("duplicate"),
+            "median_ms": round(statistics.median(seconds) * 1000, 2),
+            "total_s": round(sum(seconds), 4),
+        }
+        print(f"Screened {args.pages} pages in {sum(seconds):.3f} s "
+              f"(median {statistics.median(seconds) * 1000:.1f} ms/page): "
+              f"{kinds.count('unique')} to OCR, {kinds.count('blank')} blank, "
+              f"{kinds.count('duplicate')} duplicate")
+
+        if not use_ocr:
+            print("Tesseract not found: skipping the conversion timings")
+        else:
+            for screening in (False, True):
+                output_folder = tempfile.mkdtemp(prefix="out_", dir=tmp)
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                    elapsed = executor.submit(convert_once, pdf_path, output_folder,
+                                              args.lang, screening).result()
+                results["convert_screening_on_s" if screening else "convert_screening_off_s"] = round(elapsed, 3)
+                print(f"Conversion with screening {'on ' if screening else 'off'}: {elapsed:.2f} s")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
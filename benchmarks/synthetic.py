@@ -0,0 +1,76 @@
+"""
+Synthetic PDFs for the benchmarks, generated locally with PyMuPDF and a
+fixed random seed so every run measures the same documents.
+"""
+import fitz  # PyMuPDF
+import numpy as np
+
+PAGE_KINDS = ["text", "scanned", "mixed", "large", "poster"]
+# Not measured by default: scanned pages where most of the OCR can be skipped
+EXTRA_KINDS = ["repeats"]
+
+_LINE = "The quick brown fox jumps over the lazy dog. 0123456789 " * 4
+_WORDS = _LINE.split()
+
+def _write_text(page, fontsize=10, rng=None):
+    """Fills the page with lines of text, shuffled by `rng` when given."""
+    step = int(fontsize * 1.6)
+    for y in range(60, int(page.rect.height) - 40, step):
+        line = " ".join(rng.permutation(_WORDS)) if rng is not None else _LINE
+        page.insert_text((40, y), line[:95], fontsize=fontsize)
+
+def _scan_image(width, height, zoom, rng, text_rng=None, blank=False):
+    """
+    Renders a text page (an empty sheet if `blank`) and degrades it like a
+    scan (uneven lighting and noise). Each page gets different text from
+    `rng`, so pages are not near-duplicates of each other; pass the same
+    `text_rng` state to rescan a page. Returns PNG bytes of the grayscale
+    image.
+    """
+    doc = fitz.open()
+    page = doc.new_page(width=width, height=height)
+    if not blank:
+        _write_text(page, fontsize=10 * width / 595, rng=text_rng if text_rng is not None else rng)
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY)
+    gray = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width]
+    doc.close()
+
+    lighting = np.linspace(0, 60, gray.shape[1], dtype=np.float32)
+    noisy = gray.astype(np.float32) - lighting + rng.normal(0, 12, gray.shape)
+    noisy = np.ascontiguousarray(np.clip(noisy, 0, 255).astype(np.uint8))
+    scan = fitz.Pixmap(fitz.csGRAY, noisy.shape[1], noisy.shape[0], noisy.tobytes(), False)
+    return scan.tobytes("png")
+
+def make_pdf(path, kind, pages, seed=0):
+    """
+    Writes a `pages` page PDF of one kind:
+    text    - born-digital text pages (no OCR needed)
+    scanned - A4 pages that are only a noisy 200 DPI image
+    mixed   - alternating text and scanned pages
+    large   - A1 (594x841 mm) scanned pages, over the render pixel budget
+    poster  - A0 (841x1189 mm) scanned pages, still over the budget at the
+              lowest DPI, so they are OCR'd in tiles
+    repeats - scanned pages in groups of four: a rescan of the same cover
+              sheet, two unique pages and a blank separator sheet
+    """
+    if kind not in PAGE_KINDS + EXTRA_KINDS:
+        raise ValueError(f"Unknown page kind: {kind}")
+    rng = np.random.default_rng(seed)
+    doc = fitz.open()
+    width, height = {"large": (1684, 2384), "poster": (2384, 3370)}.get(kind, (595, 842))
+    for i in range(pages):
+        page = doc.new_page(width=width, height=height)
+        scanned = kind in ("scanned", "large", "poster") or (kind == "mixed" and i % 2)
+        if kind == "repeats":
+            # The cover's text comes from a generator seeded the same way every time
+            cover = np.random.default_rng(seed + 1) if i % 4 == 0 else None
+            page.insert_image(page.rect, stream=_scan_image(width, height, 200 / 72, rng,
+                                                            text_rng=cover, blank=i % 4 == 3))
+        elif scanned:
+            zoom = 100 / 72 if kind in ("large", "poster") else 200 / 72
+            page.insert_image(page.rect, stream=_scan_image(width, height, zoom, rng))
+        else:
+            page.insert_text((40, 40), f"Page {i + 1}", fontsize=14)
+            _write_text(page)
+    doc.save(path, garbage=3, deflate=True)
+    doc.close()
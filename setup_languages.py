@@ -1,3 +1,4 @@
+import argparse
 import os
 import urllib.request
 import sys
@@ -11,13 +12,25 @@ def download_file(url, dest):
         print(f"Error downloading {url}: {e}")
 
 def main():
-    # Using tessdata_fast for speed and smaller size
-    base_url = "https://github.com/tesseract-ocr/tessdata_fast/raw/main/"
-    
-    langs = ["por.traineddata", "eng.traineddata", "spa.traineddata"]
+    parser = argparse.ArgumentParser(description="Downloads the Tesseract language models.")
+    parser.add_argument("--best", action="store_true",
+                        help="Download the tessdata_best models (slower, more accurate) to "
+                             "app/assets/tessdata_best, for tiered OCR (ocr_tiered)")
+    parser.add_argument("--langs", nargs="+", default=["por", "eng", "spa"], help="Language codes")
+    args = parser.parse_args()
+
+    if args.best:
+        # Second OCR tier: only low-confidence pages are OCR'd with these
+        base_url = "https://github.com/tesseract-ocr/tessdata_best/raw/main/"
+        target_dir = os.path.join(os.getcwd(), "app", "assets", "tessdata_best")
+    else:
+        # Using tessdata_fast for speed and smaller size
+        base_url = "https://github.com/tesseract-ocr/tessdata_fast/raw/main/"
+        # Target directory: app/assets/tessdata
+        target_dir = os.path.join(os.getcwd(), "app", "assets", "tessdata")
+
+    langs = [f"{lang}.traineddata" for lang in args.langs]
     
-    # Target directory: app/assets/tessdata
-    target_dir = os.path.join(os.getcwd(), "app", "assets", "tessdata")
     if not os.path.exists(target_dir):
         os.makedirs(target_dir)
         
@@ -15,6 +15,28 @@ try:
 
     langs = ocr.get_available_languages()
     print(f"Available Languages: {langs}")
-    
+
+    # In-process tesserocr backend (used when installed): read a rendered
+    # line and compare with the tesseract executable
+    from app.core.ocr import TesserocrBackend
+    tesserocr_backend = TesserocrBackend()
+    print(f"tesserocr Available: {tesserocr_backend.is_available()}")
+    if tesserocr_backend.is_available():
+        import fitz
+        from PIL import Image
+        lang = "eng" if "eng" in langs else langs[0]
+        doc = fitz.open()
+        page = doc.new_page(width=400, height=80)
+        page.insert_text((20, 50), "Tesseract 2024", fontsize=28)
+        pix = page.get_pixmap(dpi=200, colorspace=fitz.csGRAY)
+        image = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+        doc.close()
+        pdf_bytes, confidence = tesserocr_backend.image_to_pdf_and_confidence(image, lang)
+        words = [word[-1] for word in tesserocr_backend.image_to_data(image, lang)]
+        expected = [word[-1] for word in ocr.fallback.image_to_data(image, lang)]
+        print(f"tesserocr read: {words} (confidence {confidence:.0f}, PDF {len(pdf_bytes)} bytes)")
+        print(f"tesserocr matches tesseract: {words == expected}")
+        print(f"tesserocr killable: {tesserocr_backend.killable} (cancellable runs OCR in a worker process)")
+
 except Exception as e:
     print(f"Error: {e}")